@@ -10,7 +10,7 @@ from datetime import datetime
 
 from anthropic import Anthropic
 
-from agents.state import AgentState
+from agents.state import AgentState, build_system_prompt
 from config import settings
 from services.cache import cache_manager
 from services.rag import rag_service
@@ -106,7 +106,9 @@ Tu es un archiviste méticuleux qui transforme l'information en connaissance str
             query_analysis = await self._analyze_query(input_text, context)
 
             # Check cache for similar knowledge queries
-            cache_key = self._generate_cache_key(input_text, query_analysis["key_concepts"])
+            cache_key = self._generate_cache_key(
+                input_text, query_analysis["key_concepts"], state.get("memory_pack_version", "")
+            )
             cached_response = await cache_manager.get_llm_response(cache_key, self.model)
 
             if cached_response:
@@ -117,7 +119,7 @@ Tu es un archiviste méticuleux qui transforme l'information en connaissance str
             prompt = await self._prepare_knowledge_prompt(input_text, context, query_analysis)
 
             # Call Claude with context
-            response = await self._call_claude(prompt)
+            response = await self._call_claude(prompt, build_system_prompt(self.system_prompt, state))
 
             # Process and enrich response with references
             formatted_response = self._format_response(response["content"], context)
@@ -285,7 +287,7 @@ RÉPONSE MIMIR (basée sur les connaissances archivées):"""
 
         return prompt
 
-    async def _call_claude(self, prompt: str) -> Dict[str, Any]:
+    async def _call_claude(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
         """Call Claude API with optimized settings for Mimir"""
 
         try:
@@ -294,7 +296,7 @@ RÉPONSE MIMIR (basée sur les connaissances archivées):"""
                 model=self.model,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
-                system=self.system_prompt,
+                system=system_prompt or self.system_prompt,
                 messages=[{
                     "role": "user",
                     "content": prompt
@@ -471,12 +473,12 @@ RÉPONSE MIMIR (basée sur les connaissances archivées):"""
 
         return round(cost_eur, 4)
 
-    def _generate_cache_key(self, query: str, concepts: List[str]) -> str:
+    def _generate_cache_key(self, query: str, concepts: List[str], memory_version: str = "") -> str:
         """Generate cache key for knowledge query"""
         import hashlib
 
         concepts_str = ",".join(sorted(concepts))
-        content = f"{query}:{concepts_str}:{self.model}:{self.temperature}"
+        content = f"{query}:{concepts_str}:{memory_version}:{self.model}:{self.temperature}"
         return hashlib.md5(content.encode()).hexdigest()
 
     def _log_usage(self, tokens: int, cost: float, duration_ms: float):
@@ -179,6 +179,8 @@ class PlumeOrchestrator:
                     state["similar_past_conversations"] = memory_context.get("similar_past_conversations", [])
                     state["user_preferences"] = memory_context.get("user_preferences", {})
                     state["conversation_summary"] = memory_context.get("conversation_summary", "")
+                    state["memory_pack"] = memory_context.get("memory_pack", "")
+                    state["memory_pack_version"] = memory_context.get("memory_pack_version", "")
 
                     logger.info(
                         "Conversation memory loaded",
@@ -10,7 +10,7 @@ from datetime import datetime
 
 from anthropic import Anthropic
 
-from agents.state import AgentState
+from agents.state import AgentState, build_system_prompt
 from config import settings
 from services.cache import cache_manager
 from utils.logger import get_agent_logger, cost_logger
@@ -88,7 +88,9 @@ Quand tu ne peux pas restituer parfaitement (information incomplète, ambiguë),
             context_analysis = await self._analyze_input_context(input_text)
 
             # Check cache for similar requests
-            cache_key = self._generate_cache_key(input_text, context_analysis["type"])
+            cache_key = self._generate_cache_key(
+                input_text, context_analysis["type"], state.get("memory_pack_version", "")
+            )
             cached_response = await cache_manager.get_llm_response(cache_key, self.model)
 
             if cached_response:
@@ -99,7 +101,7 @@ Quand tu ne peux pas restituer parfaitement (information incomplète, ambiguë),
             prompt = await self._prepare_prompt(input_text, context_analysis, state)
 
             # Call Claude
-            response = await self._call_claude(prompt)
+            response = await self._call_claude(prompt, build_system_prompt(self.system_prompt, state))
 
             # Process and format response
             formatted_response = self._format_response(response["content"])
@@ -231,7 +233,7 @@ RÉPONSE (restitution parfaite):"""
 
         return prompt
 
-    async def _call_claude(self, prompt: str) -> Dict[str, Any]:
+    async def _call_claude(self, prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
         """Call Claude API with optimized settings for Plume"""
 
         try:
@@ -240,7 +242,7 @@ RÉPONSE (restitution parfaite):"""
                 model=self.model,
                 max_tokens=self.max_tokens,
                 temperature=self.temperature,
-                system=self.system_prompt,
+                system=system_prompt or self.system_prompt,
                 messages=[{
                     "role": "user",
                     "content": prompt
@@ -379,11 +381,11 @@ RÉPONSE (restitution parfaite):"""
 
         return round(cost_eur, 4)
 
-    def _generate_cache_key(self, input_text: str, context_type: str) -> str:
+    def _generate_cache_key(self, input_text: str, context_type: str, memory_version: str = "") -> str:
         """Generate cache key for request"""
         import hashlib
 
-        content = f"{input_text}:{context_type}:{self.model}:{self.temperature}"
+        content = f"{input_text}:{context_type}:{memory_version}:{self.model}:{self.temperature}"
         return hashlib.md5(content.encode()).hexdigest()
 
     def _log_usage(self, tokens: int, cost: float, duration_ms: float):
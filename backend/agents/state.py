@@ -35,6 +35,8 @@ class AgentState(TypedDict, total=False):
     similar_past_conversations: List[Dict[str, Any]]  # Similar past conversations
     user_preferences: Dict[str, Any]       # User preferences
     conversation_summary: str              # Current conversation topic summary
+    memory_pack: str                       # Deterministic long-term memory block for prompts
+    memory_pack_version: str               # Hash of memory_pack (unchanged pack = cache hit)
     routing_metadata: Dict[str, Any]       # Intent classification metadata
 
     # Agent responses
@@ -165,6 +167,8 @@ def create_initial_state(
         similar_past_conversations=[],
         user_preferences={},
         conversation_summary="",
+        memory_pack="",
+        memory_pack_version="",
         routing_metadata={},
 
         # Responses (will be filled during workflow)
@@ -207,6 +211,19 @@ def create_initial_state(
         similarity_scores=[]
     )
 
+def build_system_prompt(system_prompt: str, state: AgentState) -> str:
+    """
+    Append the long-term memory pack to an agent's static system prompt
+
+    The static prompt stays first so the prefix is identical on every turn;
+    the pack is deterministic, so an unchanged memory keeps the whole system
+    prompt byte-identical (provider prompt cache hit).
+    """
+    memory_pack = state.get("memory_pack", "")
+    if not memory_pack:
+        return system_prompt
+    return f"{system_prompt}\n\nMÉMOIRE LONG TERME (échanges passés pertinents):\n{memory_pack}"
+
 def add_processing_step(state: AgentState, step: str) -> AgentState:
     """Add a processing step to the state"""
     state["processing_steps"].append(step)
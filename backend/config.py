@@ -118,6 +118,7 @@ class Settings(BaseSettings):
     RAG_CHUNK_OVERLAP: int = Field(default=50, env="RAG_CHUNK_OVERLAP")
     RAG_TOP_K: int = Field(default=10, env="RAG_TOP_K")
     RAG_SIMILARITY_THRESHOLD: float = Field(default=0.78, env="RAG_SIMILARITY_THRESHOLD")
+    RAG_FUSION_ALPHA: float = Field(default=0.5, env="RAG_FUSION_ALPHA")  # Vector weight in "cc" fusion
 
     # =============================================================================
     # RATE LIMITING
@@ -226,6 +227,13 @@ class Settings(BaseSettings):
             raise ValueError("Similarity threshold must be between 0.0 and 1.0")
         return v
 
+    @field_validator("RAG_FUSION_ALPHA")
+    @classmethod
+    def validate_fusion_alpha(cls, v):
+        if not 0.0 <= v <= 1.0:
+            raise ValueError("Fusion alpha must be between 0.0 and 1.0")
+        return v
+
     # =============================================================================
     # COMPUTED PROPERTIES
     # =============================================================================
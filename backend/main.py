@@ -22,6 +22,9 @@ from api import chat, archive, search, health, auth, conversations, notes, metri
 from api import upload  # Already exists but now has new endpoints
 from services.cache import cache_manager
 from services.storage import supabase_client
+from services.memory_service import memory_service
+from services.rag import rag_service
+from services.rag_service import get_rag_service
 from agents.orchestrator import PlumeOrchestrator
 
 # Setup structured logging
@@ -54,6 +57,9 @@ async def lifespan(app: FastAPI):
         await cache_manager.initialize()
         logger.info("Cache system initialized")
 
+        # Start memory background jobs (embedding backfill)
+        await memory_service.initialize()
+
         # Initialize orchestrator
         await orchestrator.initialize()
         logger.info("Orchestrator initialized successfully")
@@ -74,8 +80,11 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down Plume & Mimir backend")
     try:
+        await memory_service.close()
+        await rag_service.close()
+        await get_rag_service().close()
         await cache_manager.close()
-        # Close other connections if needed
+        await supabase_client.close()
         logger.info("Backend shutdown completed")
     except Exception as e:
         logger.error("Error during shutdown", error=str(e))
@@ -286,11 +286,17 @@ class CacheManager:
         key = f"search:{search_type}:{query_hash}"
         return await self.get(key)
 
-    async def set_search_results(self, query_hash: str, search_type: str, results: List[Dict[str, Any]]):
+    async def set_search_results(
+        self,
+        query_hash: str,
+        search_type: str,
+        results: List[Dict[str, Any]],
+        ttl: int = 3600
+    ):
         """Cache search results"""
         key = f"search:{search_type}:{query_hash}"
-        # Search results have shorter TTL
-        await self.set(key, results, ttl=3600)  # 1 hour
+        # Search results have shorter TTL (1 hour by default)
+        await self.set(key, results, ttl=ttl)
 
     # =============================================================================
     # CACHE INVALIDATION
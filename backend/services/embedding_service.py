@@ -252,18 +252,15 @@ class EmbeddingService:
             raise ValueError("Embeddings must have same dimensions")
 
         # Convert to numpy arrays
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
+        vec1 = np.asarray(embedding1, dtype=np.float64)
+        vec2 = np.asarray(embedding2, dtype=np.float64)
 
-        # Calculate cosine similarity
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-
-        if norm1 == 0 or norm2 == 0:
+        # Calculate cosine similarity (one sqrt of the product of squared norms)
+        squared_norms = np.vdot(vec1, vec1) * np.vdot(vec2, vec2)
+        if squared_norms == 0:
             return 0.0
 
-        similarity = dot_product / (norm1 * norm2)
+        similarity = np.vdot(vec1, vec2) / np.sqrt(squared_norms)
         return float(similarity)
 
     def find_most_similar(self,
@@ -282,15 +279,23 @@ class EmbeddingService:
             List of (text, similarity_score) tuples, sorted by similarity
         """
 
-        similarities = []
+        if not candidates:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float64)
+        matrix = np.asarray([embedding for _, embedding in candidates], dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != query.shape[0]:
+            raise ValueError("Embeddings must have same dimensions")
 
-        for text, embedding in candidates:
-            similarity = self.calculate_similarity(query_embedding, embedding)
-            similarities.append((text, similarity))
+        # Cosine similarity of every candidate in one matrix-vector product
+        squared_norms = np.einsum("ij,ij->i", matrix, matrix) * np.vdot(query, query)
+        dot_products = matrix @ query
+        similarities = np.zeros(len(candidates))
+        np.divide(dot_products, np.sqrt(squared_norms), out=similarities, where=squared_norms > 0)
 
         # Sort by similarity (descending) and return top k
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
+        order = np.argsort(-similarities, kind="stable")[:top_k]
+        return [(candidates[i][0], float(similarities[i])) for i in order]
 
     async def clear_cache(self):
         """Clear all cached embeddings"""
@@ -233,7 +233,8 @@ class EmbeddingService:
                     # Call OpenAI API for batch
                     response = await self.client.embeddings.create(
                         input=batch,
-                        model=self.model
+                        model=self.model,
+                        dimensions=self.dimensions  # Must match vector(1536) columns
                     )
 
                     batch_embeddings = [item.embedding for item in response.data]
@@ -5,13 +5,71 @@ Supports both keyword-based and LLM-based classification
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
-from anthropic import Anthropic
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from anthropic import AsyncAnthropic
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    # Fallback to the stdlib json parser
+    ORJSON_AVAILABLE = False
+
 from config import settings
+from services.cache import LRUCache
+from utils.keyword_matcher import KeywordMatcher, flatten_keyword_table
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Intent names, in the order used by cached score tuples
+INTENTS = ("restitution", "recherche", "discussion")
+
+# JSON embedded in LLM responses (compiled once)
+_JSON_OBJECT_RE = re.compile(r'\{.*?\}', re.S)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.S)
+
+# Category descriptions shared by the single and batched LLM prompts
+INTENT_CATEGORIES_PROMPT = """Tu es un classificateur d'intentions pour un système d'agents IA.
+
+Classifie l'intention de l'utilisateur parmi ces 3 catégories:
+
+1. **restitution** - L'utilisateur veut:
+   - Reformuler, résumer ou clarifier du contenu
+   - Transcrire ou corriger du texte
+   - Obtenir une présentation claire d'informations existantes
+   - Exemples: "Résume ce texte", "Reformule cette idée", "Corrige cette phrase"
+
+2. **recherche** - L'utilisateur veut:
+   - Chercher des informations dans une base de connaissances
+   - Obtenir des réponses factuelles à des questions
+   - Trouver de la documentation ou des sources
+   - Exemples: "Où se trouve...", "Qu'est-ce que...", "Trouve-moi des infos sur..."
+
+3. **discussion** - L'utilisateur veut:
+   - Analyser en profondeur un sujet complexe
+   - Comparer plusieurs perspectives ou options
+   - Débattre des avantages/inconvénients
+   - Obtenir une évaluation critique
+   - Exemples: "Compare X et Y", "Analyse les avantages de...", "Débat sur..."
+"""
+
+# Single-message classification prompt (static parts built once)
+LLM_PROMPT_TEMPLATE = INTENT_CATEGORIES_PROMPT + """
+{context_block}Message utilisateur:
+"{input_text}"
+
+Réponds UNIQUEMENT au format JSON:
+{{
+    "intent": "restitution" | "recherche" | "discussion",
+    "confidence": 0.0-1.0,
+    "reasoning": "explication brève, ou vide si confidence > 0.9"
+}}"""
+
 
 class IntentClassifier:
     """
@@ -25,31 +83,58 @@ class IntentClassifier:
 
     # Intent keywords mapping
     INTENT_KEYWORDS = {
-        "restitution": [
+        "restitution": frozenset({
             "reformule", "résume", "transcris", "explique", "simplifie",
             "clarifie", "traduis", "corrige", "améliore", "rédige",
             "écris", "formule", "présente", "décris"
-        ],
-        "recherche": [
+        }),
+        "recherche": frozenset({
             "cherche", "trouve", "recherche", "où", "quel", "quelle",
             "quels", "quelles", "qui", "comment", "quand", "combien",
             "qu'est-ce", "définition", "documentation", "source"
-        ],
-        "discussion": [
+        }),
+        "discussion": frozenset({
             "compare", "analyser", "débat", "différence", "avantages",
             "inconvénients", "évalue", "critique", "discute", "opinion",
             "perspectives", "pour et contre", "vs", "versus"
-        ]
+        })
     }
 
     # Question indicators
-    QUESTION_INDICATORS = ["?", "pourquoi", "comment", "qu'est", "que"]
+    QUESTION_INDICATORS = frozenset({"?", "pourquoi", "comment", "qu'est", "que"})
 
     # Complex analysis indicators
-    COMPLEX_INDICATORS = [
+    COMPLEX_INDICATORS = frozenset({
         "expliquer en détail", "analyse approfondie", "étude comparative",
         "évaluation critique", "plusieurs points de vue"
-    ]
+    })
+
+    # (keyword, tag, weight) entries, weight = 1/len(keywords) baked in.
+    # Indicators only need presence: any non-zero tally triggers the bonus.
+    # Keywords are casefolded once here; input text is casefolded per call
+    INTENT_KEYWORDS_FLAT = flatten_keyword_table({
+        tag: {keyword.casefold() for keyword in keywords}
+        for tag, keywords in {
+            **INTENT_KEYWORDS,
+            "question": QUESTION_INDICATORS,
+            "complex": COMPLEX_INDICATORS
+        }.items()
+    })
+
+    # Single-pass matcher over intent keywords and indicators (built once)
+    # Keywords match at word starts only: "que" no longer fires on "explique"
+    KEYWORD_MATCHER = KeywordMatcher(INTENT_KEYWORDS_FLAT, word_start=True)
+
+    # Inputs at least this long (chars) are keyword-scanned off the event loop
+    KEYWORD_THREAD_THRESHOLD = 8192
+
+    # LLM classification settings
+    LLM_MODEL = "claude-3-haiku-20240307"  # Fast and cheap
+    LLM_BATCH_MAX_SIZE = 16  # Max classifications coalesced into one call
+    LLM_BATCH_WINDOW = 0.05  # Seconds to wait for concurrent requests
+    LLM_TIMEOUT = 5.0  # Seconds before falling back to keywords
+    LLM_MAX_TOKENS = 80  # Output budget per classified message (JSON is ~60 tokens)
+    LLM_MAX_INPUT_CHARS = 2000  # Message chars sent to the LLM
 
     def __init__(self, use_llm: bool = False):
         """
@@ -61,9 +146,17 @@ class IntentClassifier:
         """
         self.use_llm = use_llm
         self.client = None
+        # LLM results keyed by SHA1 of (context summary, input text)
+        self._llm_cache = LRUCache(max_size=1024)
+
+        # Micro-batching state (created lazily on the running event loop)
+        self._llm_batch_queue: Optional[asyncio.Queue] = None
+        self._batch_worker_task: Optional[asyncio.Task] = None
+        self._batch_tasks: set = set()
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
 
         if use_llm:
-            self.client = Anthropic(api_key=settings.CLAUDE_API_KEY)
+            self.client = AsyncAnthropic(api_key=settings.CLAUDE_API_KEY)
             logger.info("Intent classifier initialized with LLM mode")
         else:
             logger.info("Intent classifier initialized with keyword mode")
@@ -100,6 +193,11 @@ class IntentClassifier:
         try:
             if self.use_llm:
                 return await self._classify_with_llm(input_text, conversation_context)
+            elif len(input_text) >= self.KEYWORD_THREAD_THRESHOLD:
+                # Large pastes: scan in a worker thread to keep the event loop responsive
+                return await asyncio.to_thread(
+                    self._classify_with_keywords, input_text, conversation_context
+                )
             else:
                 return self._classify_with_keywords(input_text, conversation_context)
 
@@ -117,57 +215,18 @@ class IntentClassifier:
         Keyword-based classification (fast and cheap)
         """
 
-        lower_text = input_text.lower().strip()
-        text_length = len(input_text)
-
-        # Score each intent based on keyword matches
-        scores = {
-            "restitution": 0.0,
-            "recherche": 0.0,
-            "discussion": 0.0
-        }
+        lower_text = input_text.strip().casefold()
+        text_length = len(lower_text)
+        long_context = bool(conversation_context) and len(conversation_context) > 5
 
-        # Check keywords for each intent
-        for intent, keywords in self.INTENT_KEYWORDS.items():
-            matches = sum(1 for keyword in keywords if keyword in lower_text)
-            if matches > 0:
-                scores[intent] = matches / len(keywords)
-
-        # Question detection (favors recherche)
-        if any(indicator in lower_text for indicator in self.QUESTION_INDICATORS):
-            scores["recherche"] += 0.3
-
-        # Complex indicators (favors discussion)
-        if any(indicator in lower_text for indicator in self.COMPLEX_INDICATORS):
-            scores["discussion"] += 0.4
-
-        # Text length influence
-        if text_length > 200:
-            scores["discussion"] += 0.1  # Long text might need discussion
-        elif text_length < 50:
-            scores["restitution"] += 0.1  # Short text likely simple restitution
-
-        # Conversation context influence
-        if conversation_context and len(conversation_context) > 5:
-            # Long conversation might need discussion
-            scores["discussion"] += 0.1
-
-        # Determine winner
-        if max(scores.values()) == 0:
-            # No matches, use defaults based on heuristics
-            if "?" in input_text:
-                intent = "recherche"
-                confidence = 0.6
-            else:
-                intent = "restitution"
-                confidence = 0.5
-        else:
-            intent = max(scores, key=scores.get)
-            confidence = min(scores[intent] + 0.5, 0.95)  # Cap at 0.95
+        # Pure scoring, memoized on its inputs
+        intent, confidence, score_values = _score_keywords(lower_text, text_length, long_context)
+        scores = dict(zip(INTENTS, score_values))
 
         reasoning = f"Keyword-based: {intent} scored {scores[intent]:.2f}"
 
-        logger.info(
+        # Debug level: filtered out by structlog unless debug output is on
+        logger.debug(
             "Intent classified with keywords",
             intent=intent,
             confidence=confidence,
@@ -190,95 +249,62 @@ class IntentClassifier:
         """
         LLM-based classification (accurate but slower/costlier)
         Uses Claude Haiku for fast, cheap classification
+        Concurrent calls are coalesced into a single batched request
         """
 
-        # Build context summary if available
-        context_summary = ""
-        if conversation_context:
-            recent_messages = conversation_context[-3:]  # Last 3 messages
-            context_summary = "\n".join([
-                f"- {msg.get('role', 'user')}: {msg.get('content', '')[:100]}"
-                for msg in recent_messages
-            ])
-
-        prompt = f"""Tu es un classificateur d'intentions pour un système d'agents IA.
-
-Classifie l'intention de l'utilisateur parmi ces 3 catégories:
-
-1. **restitution** - L'utilisateur veut:
-   - Reformuler, résumer ou clarifier du contenu
-   - Transcrire ou corriger du texte
-   - Obtenir une présentation claire d'informations existantes
-   - Exemples: "Résume ce texte", "Reformule cette idée", "Corrige cette phrase"
-
-2. **recherche** - L'utilisateur veut:
-   - Chercher des informations dans une base de connaissances
-   - Obtenir des réponses factuelles à des questions
-   - Trouver de la documentation ou des sources
-   - Exemples: "Où se trouve...", "Qu'est-ce que...", "Trouve-moi des infos sur..."
-
-3. **discussion** - L'utilisateur veut:
-   - Analyser en profondeur un sujet complexe
-   - Comparer plusieurs perspectives ou options
-   - Débattre des avantages/inconvénients
-   - Obtenir une évaluation critique
-   - Exemples: "Compare X et Y", "Analyse les avantages de...", "Débat sur..."
-
-{"Contexte conversation récente:" if context_summary else ""}
-{context_summary if context_summary else ""}
-
-Message utilisateur:
-"{input_text}"
-
-Réponds UNIQUEMENT au format JSON:
-{{
-    "intent": "restitution" | "recherche" | "discussion",
-    "confidence": 0.0-1.0,
-    "reasoning": "explication brève"
-}}"""
+        # Build context summary from the last 3 messages (100 chars each)
+        parts = []
+        for msg in (conversation_context or ())[-3:]:
+            content = msg.get("content") or ""
+            role = msg.get("role") or "user"
+            parts.append(f"- {role}: {content[:100]}")
+        context_summary = "\n".join(parts)
+
+        # The opening of a long paste is enough to judge intent; keep prompts small
+        prompt_text = input_text[:self.LLM_MAX_INPUT_CHARS]
+
+        # Same prompt at temperature 0.1 gives the same label: serve from cache
+        cache_key = hashlib.sha1(
+            f"{context_summary}\x00{prompt_text}".encode("utf-8")
+        ).hexdigest()
+        cached = self._llm_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
 
         try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Fast and cheap
-                max_tokens=200,
-                temperature=0.1,
-                messages=[{"role": "user", "content": prompt}]
+            # Bounded wait: a stuck Haiku call must not hold up routing
+            result = await asyncio.wait_for(
+                self._submit_llm_classification(prompt_text, context_summary),
+                timeout=self.LLM_TIMEOUT
             )
 
-            # Parse response
-            response_text = response.content[0].text.strip()
-
-            # Try to extract JSON
-            import json
-            import re
-
-            # Find JSON in response
-            json_match = re.search(r'\{[^}]+\}', response_text)
-            if json_match:
-                result = json.loads(json_match.group())
-
+            if result is not None:
                 intent = result.get("intent", "restitution")
                 confidence = float(result.get("confidence", 0.8))
-                reasoning = result.get("reasoning", "LLM classification")
+                reasoning = result.get("reasoning") or "LLM classification"
 
                 # Validate intent
-                if intent not in ["restitution", "recherche", "discussion"]:
+                if intent not in INTENTS:
                     logger.warning(f"Invalid intent from LLM: {intent}, defaulting to restitution")
                     intent = "restitution"
 
-                logger.info(
+                logger.debug(
                     "Intent classified with LLM",
                     intent=intent,
                     confidence=confidence,
                     reasoning=reasoning
                 )
 
-                return {
+                classification = {
                     "intent": intent,
                     "confidence": confidence,
                     "reasoning": f"LLM: {reasoning}",
                     "method": "llm"
                 }
+                self._llm_cache.set(
+                    cache_key, classification, ttl=settings.CACHE_TTL_LLM_RESPONSES
+                )
+                return dict(classification)
             else:
                 logger.warning("Could not parse JSON from LLM response, falling back to keywords")
                 return self._classify_with_keywords(input_text, conversation_context)
@@ -288,6 +314,242 @@ Réponds UNIQUEMENT au format JSON:
             # Fallback to keyword-based
             return self._classify_with_keywords(input_text, conversation_context)
 
+    async def _submit_llm_classification(
+        self,
+        input_text: str,
+        context_summary: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Queue a classification for the batch worker and wait for its result
+
+        Returns the parsed JSON object from the LLM, or None if unparseable
+        """
+
+        loop = asyncio.get_running_loop()
+        if (
+            self._batch_loop is not loop
+            or self._batch_worker_task is None
+            or self._batch_worker_task.done()
+        ):
+            self._llm_batch_queue = asyncio.Queue()
+            self._batch_loop = loop
+            self._batch_worker_task = asyncio.create_task(
+                self._batch_worker(self._llm_batch_queue)
+            )
+
+        future = loop.create_future()
+        await self._llm_batch_queue.put((input_text, context_summary, future))
+        return await future
+
+    async def _batch_worker(self, queue: asyncio.Queue):
+        """
+        Coalesce classifications arriving within LLM_BATCH_WINDOW into one call
+        """
+
+        while True:
+            batch = [await queue.get()]
+
+            # Give concurrent requests a short window to join the batch
+            await asyncio.sleep(self.LLM_BATCH_WINDOW)
+            while len(batch) < self.LLM_BATCH_MAX_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            # Dispatch without awaiting so a slow call doesn't delay the next batch
+            task = asyncio.create_task(self._dispatch_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch_batch(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        """Run one batched LLM call and resolve the futures of its callers"""
+
+        try:
+            results = await self._classify_batch_with_llm(
+                [(input_text, context_summary) for input_text, context_summary, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _classify_batch_with_llm(
+        self,
+        items: List[Tuple[str, str]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Classify (input_text, context_summary) items with a single LLM call
+
+        A single item uses the plain prompt; several items are numbered in one
+        prompt and the LLM answers with a JSON array in the same order.
+        """
+
+        request: Dict[str, Any] = {}
+        if len(items) == 1:
+            prompt = self._build_llm_prompt(*items[0])
+            # Stop as soon as the JSON object closes (no trailing notes)
+            request["stop_sequences"] = ["}"]
+        else:
+            prompt = self._build_llm_batch_prompt(items)
+
+        response = await self.client.messages.create(
+            model=self.LLM_MODEL,
+            max_tokens=self.LLM_MAX_TOKENS * len(items),
+            temperature=0.1,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=self.LLM_TIMEOUT,
+            **request
+        )
+
+        # Parse response
+        response_text = response.content[0].text.strip()
+        if response.stop_reason == "stop_sequence":
+            # The matched stop sequence is not included in the text
+            response_text += "}"
+
+        if getattr(response, "usage", None):
+            logger.debug(
+                "Intent LLM call completed",
+                batch_size=len(items),
+                output_tokens=response.usage.output_tokens
+            )
+
+        if len(items) == 1:
+            result = _extract_json(response_text, _JSON_OBJECT_RE)
+            return [result if isinstance(result, dict) else None]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        parsed = _extract_json(response_text, _JSON_ARRAY_RE)
+        if isinstance(parsed, list):
+            for index, result in enumerate(parsed[:len(items)]):
+                if isinstance(result, dict):
+                    results[index] = result
+        return results
+
+    @staticmethod
+    def _build_llm_prompt(input_text: str, context_summary: str) -> str:
+        """Build the classification prompt for a single message"""
+
+        context_block = (
+            f"Contexte conversation récente:\n{context_summary}\n\n" if context_summary else ""
+        )
+        return LLM_PROMPT_TEMPLATE.format(context_block=context_block, input_text=input_text)
+
+    @staticmethod
+    def _build_llm_batch_prompt(items: List[Tuple[str, str]]) -> str:
+        """Build one classification prompt covering several messages"""
+
+        blocks = []
+        for number, (input_text, context_summary) in enumerate(items, start=1):
+            block = f"[{number}]\n"
+            if context_summary:
+                block += f"Contexte conversation récente:\n{context_summary}\n"
+            block += f'Message utilisateur:\n"{input_text}"'
+            blocks.append(block)
+
+        messages = "\n\n".join(blocks)
+
+        return f"""{INTENT_CATEGORIES_PROMPT}
+Classifie chacun des {len(items)} messages suivants indépendamment.
+
+{messages}
+
+Réponds UNIQUEMENT avec un tableau JSON contenant un objet par message, dans le même ordre:
+[
+    {{
+        "intent": "restitution" | "recherche" | "discussion",
+        "confidence": 0.0-1.0,
+        "reasoning": "explication brève, ou vide si confidence > 0.9"
+    }}
+]"""
+
+
+def _extract_json(response_text: str, pattern: "re.Pattern") -> Any:
+    """
+    Parse JSON from an LLM response
+
+    Haiku usually answers with bare JSON: when the text starts like JSON,
+    parse it whole (with orjson if installed) and only search for the
+    embedded JSON with the regex if that fails. Returns None if nothing
+    parses.
+    """
+
+    if response_text.startswith(("{", "[")):
+        try:
+            return _loads_json(response_text)
+        except ValueError:
+            pass
+
+    json_match = pattern.search(response_text)
+    if not json_match:
+        return None
+    try:
+        return _loads_json(json_match.group())
+    except ValueError:
+        return None
+
+
+def _loads_json(text: str) -> Any:
+    """Decode JSON, preferring orjson; both parsers raise ValueError subclasses"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+@lru_cache(maxsize=4096)
+def _score_keywords(
+    lower_text: str,
+    text_length: int,
+    long_context: bool
+) -> Tuple[str, float, Tuple[float, ...]]:
+    """
+    Score intents from keyword matches and heuristics
+
+    Returns (intent, confidence, scores ordered as INTENTS). Tuples keep the
+    cache entries small and immutable; callers rebuild the scores dict.
+    """
+
+    # Check keywords for each intent (one pass over the text)
+    tallies = IntentClassifier.KEYWORD_MATCHER.scan(lower_text)
+    scores = {intent: tallies[intent] for intent in INTENTS}
+
+    # Question detection (favors recherche)
+    if tallies["question"]:
+        scores["recherche"] += 0.3
+
+    # Complex indicators (favors discussion)
+    if tallies["complex"]:
+        scores["discussion"] += 0.4
+
+    # Text length influence
+    if text_length > 200:
+        scores["discussion"] += 0.1  # Long text might need discussion
+    elif text_length < 50:
+        scores["restitution"] += 0.1  # Short text likely simple restitution
+
+    # Conversation context influence
+    if long_context:
+        # Long conversation might need discussion
+        scores["discussion"] += 0.1
+
+    # Determine winner
+    if max(scores.values()) == 0:
+        # No matches, use defaults based on heuristics
+        if "?" in lower_text:
+            intent = "recherche"
+            confidence = 0.6
+        else:
+            intent = "restitution"
+            confidence = 0.5
+    else:
+        intent = max(scores, key=scores.get)
+        confidence = min(scores[intent] + 0.5, 0.95)  # Cap at 0.95
+
+    return intent, confidence, tuple(scores[name] for name in INTENTS)
+
 
 # Global classifier instance (keyword-based by default for performance)
 intent_classifier = IntentClassifier(use_llm=False)
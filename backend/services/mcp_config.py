@@ -8,7 +8,8 @@ import os
 import json
 import aiohttp
 import asyncio
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, Optional
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -16,22 +17,61 @@ from utils.logger import get_logger
 
 logger = get_logger("mcp_config")
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class MCPEndpoint:
-    """Configuration d'un endpoint MCP"""
+    """Configuration d'un endpoint MCP (immuable une fois créée)"""
     name: str
     url: str
     auth_type: str  # bearer, api_key, etc.
-    credentials: Dict[str, str]
+    credentials: Mapping[str, str]
     timeout: int = 30
     retry_count: int = 3
 
+    def __post_init__(self):
+        # Copie en lecture seule: les headers mis en cache restent valides
+        object.__setattr__(self, "credentials", MappingProxyType(dict(self.credentials)))
+
 class MCPConfigManager:
     """Gestionnaire de configuration MCP"""
 
     def __init__(self):
         self.endpoints: Dict[str, MCPEndpoint] = {}
         self.validated_endpoints: Dict[str, bool] = {}
+        # Headers calculés une fois par endpoint (credentials immuables après ajout)
+        self._headers_cache: Dict[str, Dict[str, str]] = {}
+        # Connecteur et session partagés (keep-alive + cache DNS par process)
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_connector(self) -> aiohttp.TCPConnector:
+        """Obtenir le connecteur TCP partagé (créé à la première utilisation)"""
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=30,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+        return self._connector
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Obtenir la session HTTP partagée (créée à la première utilisation)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=self._get_connector(),
+                connector_owner=False
+            )
+        return self._session
+
+    async def close(self):
+        """Fermer la session et le connecteur HTTP partagés"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
 
     def add_render_endpoint(self, api_key: str):
         """Ajouter l'endpoint Render MCP"""
@@ -44,6 +84,7 @@ class MCPConfigManager:
             retry_count=3
         )
         self.endpoints["render"] = render_endpoint
+        self._headers_cache.pop("render", None)
 
     def add_custom_endpoint(self, name: str, url: str, credentials: Dict[str, str]):
         """Ajouter un endpoint MCP personnalisé"""
@@ -54,6 +95,7 @@ class MCPConfigManager:
             credentials=credentials
         )
         self.endpoints[name] = endpoint
+        self._headers_cache.pop(name, None)
 
     async def validate_endpoint(self, endpoint_name: str) -> bool:
         """Valider la connectivité d'un endpoint MCP"""
@@ -66,32 +108,33 @@ class MCPConfigManager:
         try:
             headers = self._build_headers(endpoint)
             timeout = aiohttp.ClientTimeout(total=endpoint.timeout)
-
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Test de connectivité basique
-                async with session.get(
-                    f"{endpoint.url}/health",  # Endpoint de santé supposé
-                    headers=headers
-                ) as response:
-                    success = response.status in [200, 404]  # 404 OK si endpoint health n'existe pas
-
-                    if success:
-                        self.validated_endpoints[endpoint_name] = True
-                        logger.info(
-                            f"MCP endpoint validated",
-                            endpoint=endpoint_name,
-                            url=endpoint.url,
-                            status_code=response.status
-                        )
-                    else:
-                        logger.error(
-                            f"MCP endpoint validation failed",
-                            endpoint=endpoint_name,
-                            url=endpoint.url,
-                            status_code=response.status
-                        )
-
-                    return success
+            session = await self._get_session()
+
+            # Test de connectivité basique
+            async with session.get(
+                f"{endpoint.url}/health",  # Endpoint de santé supposé
+                headers=headers,
+                timeout=timeout
+            ) as response:
+                success = response.status in [200, 404]  # 404 OK si endpoint health n'existe pas
+
+                if success:
+                    self.validated_endpoints[endpoint_name] = True
+                    logger.info(
+                        f"MCP endpoint validated",
+                        endpoint=endpoint_name,
+                        url=endpoint.url,
+                        status_code=response.status
+                    )
+                else:
+                    logger.error(
+                        f"MCP endpoint validation failed",
+                        endpoint=endpoint_name,
+                        url=endpoint.url,
+                        status_code=response.status
+                    )
+
+                return success
 
         except Exception as e:
             logger.error(
@@ -102,14 +145,26 @@ class MCPConfigManager:
             return False
 
     async def validate_all_endpoints(self) -> Dict[str, bool]:
-        """Valider tous les endpoints configurés"""
-        results = {}
-        for endpoint_name in self.endpoints:
-            results[endpoint_name] = await self.validate_endpoint(endpoint_name)
-        return results
+        """Valider tous les endpoints configurés (en parallèle, session partagée)"""
+        endpoint_names = list(self.endpoints)
+        # return_exceptions: un endpoint en erreur n'annule pas les autres validations
+        results = await asyncio.gather(
+            *(self.validate_endpoint(name) for name in endpoint_names),
+            return_exceptions=True
+        )
+        return {name: result is True for name, result in zip(endpoint_names, results)}
 
     def _build_headers(self, endpoint: MCPEndpoint) -> Dict[str, str]:
-        """Construire les headers pour l'authentification"""
+        """
+        Construire les headers pour l'authentification (mis en cache par endpoint)
+
+        Retourne une copie: l'appelant peut ajouter des headers sans modifier
+        ceux des sessions suivantes.
+        """
+        cached = self._headers_cache.get(endpoint.name)
+        if cached is not None:
+            return dict(cached)
+
         headers = {
             "Content-Type": "application/json",
             "User-Agent": "SCRIBE-MCP/1.0"
@@ -126,7 +181,8 @@ class MCPConfigManager:
             if api_key:
                 headers[key_header] = api_key
 
-        return headers
+        self._headers_cache[endpoint.name] = headers
+        return dict(headers)
 
     def get_session_config(self, endpoint_name: str) -> Optional[Dict[str, Any]]:
         """Obtenir la configuration de session pour un endpoint"""
@@ -138,7 +194,9 @@ class MCPConfigManager:
             "base_url": endpoint.url,
             "headers": self._build_headers(endpoint),
             "timeout": aiohttp.ClientTimeout(total=endpoint.timeout),
-            "connector": aiohttp.TCPConnector(limit=100, limit_per_host=30)
+            # Connecteur partagé: fermer la session appelante ne le ferme pas
+            "connector": self._get_connector(),
+            "connector_owner": False
         }
 
     def export_config(self) -> Dict[str, Any]:
@@ -203,7 +261,10 @@ async def test_mcp_connectivity():
         return False
 
     # Valider tous les endpoints
-    results = await config.validate_all_endpoints()
+    try:
+        results = await config.validate_all_endpoints()
+    finally:
+        await config.close()
 
     # Afficher les résultats
     all_valid = True
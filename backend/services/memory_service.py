@@ -5,17 +5,91 @@ Provides context-aware conversation history and user preferences
 """
 
 import asyncio
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
+import hashlib
+import re
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import json
 
 from services.storage import supabase_client
 from services.embeddings import embedding_service
+from services.cache import LRUCache, cache_manager
 from services.rag import rag_service
 from utils.logger import get_logger
+from utils.tokenizer import get_token_encoder
 
 logger = get_logger(__name__)
 
+# Topic query budget: trailing whole sentences of the last user messages
+TOPIC_MAX_TOKENS = 128
+TOPIC_MAX_CHARS = 200  # Used when tiktoken is unavailable
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Hot-path queries run on the asyncpg pool when available (prepared and cached per connection)
+RECENT_MESSAGES_SQL = """
+    SELECT id, role, content, metadata, created_at
+    FROM (
+        SELECT id, role, content, metadata, created_at
+        FROM messages
+        WHERE conversation_id = $1
+        ORDER BY created_at DESC
+        LIMIT $2
+    ) recent
+    ORDER BY created_at ASC
+"""
+
+CONVERSATION_TOPIC_SQL = """
+    SELECT current_topic FROM conversations WHERE id = $1
+"""
+
+# Backfill: unembedded rows older than 5 minutes are claimed newest first, with
+# SKIP LOCKED so several workers can run. Recent rows are left to the
+# store_message batch worker
+MISSING_EMBEDDINGS_SQL = """
+    SELECT id, content
+    FROM messages
+    WHERE embedding IS NULL
+        AND length(btrim(content)) > 0
+        AND created_at < NOW() - INTERVAL '5 minutes'
+    ORDER BY created_at DESC
+    LIMIT $1
+    FOR UPDATE SKIP LOCKED
+"""
+
+UPDATE_EMBEDDINGS_SQL = """
+    SELECT update_message_embeddings($1::uuid[], $2::jsonb)
+"""
+
+INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (conversation_id, role, content, metadata, created_at)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING id
+"""
+
+
+@dataclass(slots=True)
+class UserPreferences:
+    """User preferences as read on every turn (projection of user_preferences)"""
+    preferred_agent: str = "auto"
+    topics_of_interest: List[str] = field(default_factory=list)
+    interaction_patterns: Dict[str, Any] = field(default_factory=dict)
+    updated_at: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "UserPreferences":
+        """Build from a get_or_create_user_preferences row (NULL columns -> defaults)"""
+        return cls(
+            preferred_agent=row.get("preferred_agent") or "auto",
+            topics_of_interest=row.get("topics_of_interest") or [],
+            interaction_patterns=row.get("interaction_patterns") or {},
+            updated_at=row.get("updated_at")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict form for agent state and API responses"""
+        return asdict(self)
+
 
 class ConversationMemory:
     """
@@ -27,6 +101,18 @@ class ConversationMemory:
     - User preferences: Topics, preferred agents, interaction patterns
     """
 
+    EMBEDDING_BATCH_MAX_SIZE = 32  # Max messages embedded in one API call
+    EMBEDDING_BATCH_WINDOW = 0.05  # Seconds to wait for concurrent writes
+    QUERY_EMBEDDING_CACHE_SIZE = 10000
+    QUERY_EMBEDDING_CACHE_TTL = 3600  # Seconds
+    PREFERENCES_CACHE_SIZE = 1000
+    PREFERENCES_CACHE_TTL = 300  # Seconds, bounds staleness across workers
+    LONG_TERM_CACHE_TTL = 300  # Seconds, long-term search results shared across workers
+    MESSAGE_CURSOR_PREFETCH = 50  # Rows per round-trip when streaming messages
+    EMBEDDING_BACKFILL_BATCH_SIZE = 256
+    EMBEDDING_BACKFILL_INTERVAL = 60  # Seconds between backfill passes
+    EMBEDDING_BACKFILL_LOCK_TIMEOUT = 30  # Max seconds a claimed batch stays locked
+
     def __init__(
         self,
         short_term_limit: int = 10,
@@ -45,12 +131,49 @@ class ConversationMemory:
         self.long_term_search_limit = long_term_search_limit
         self.similarity_threshold = similarity_threshold
 
+        # Embedding writes are coalesced by a background worker (started lazily)
+        self._embedding_queue: Optional[asyncio.Queue] = None
+        self._embedding_worker_task: Optional[asyncio.Task] = None
+        self._embedding_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Query embeddings: topics repeat turn after turn, skip the API call
+        self._query_embedding_cache = LRUCache(max_size=self.QUERY_EMBEDDING_CACHE_SIZE)
+        self._query_embedding_inflight: Dict[str, asyncio.Future] = {}
+        self._query_embedding_hits = 0
+        self._query_embedding_misses = 0
+
+        # Fire-and-forget tasks (topic refresh), referenced until done
+        self._background_tasks: set = set()
+        self._backfill_task: Optional[asyncio.Task] = None
+
+        # User preferences change rarely but are read every turn
+        self._preferences_cache = LRUCache(max_size=self.PREFERENCES_CACHE_SIZE)
+
         logger.info(
             "Conversation memory initialized",
             short_term_limit=short_term_limit,
             long_term_search_limit=long_term_search_limit
         )
 
+    async def initialize(self):
+        """Start the embedding backfill loop (requires the Postgres pool)"""
+        if not supabase_client.pool:
+            logger.info("Postgres pool unavailable, embedding backfill disabled")
+            return
+
+        self._backfill_task = asyncio.create_task(self._embedding_backfill_loop())
+        logger.info("Embedding backfill started")
+
+    async def close(self):
+        """Stop background work"""
+        if self._backfill_task:
+            self._backfill_task.cancel()
+            try:
+                await self._backfill_task
+            except asyncio.CancelledError:
+                pass
+            self._backfill_task = None
+
     async def get_conversation_context(
         self,
         conversation_id: str,
@@ -70,44 +193,73 @@ class ConversationMemory:
                 "recent_messages": [...],
                 "similar_past_conversations": [...],
                 "user_preferences": {...},
-                "conversation_summary": str
+                "conversation_summary": str,
+                "memory_pack": str,
+                "memory_pack_version": str
             }
         """
 
         try:
             logger.info("Retrieving conversation context", conversation_id=conversation_id)
 
-            # Get short-term memory (recent messages)
-            recent_messages = await self.get_recent_messages(
+            # Recent messages and preferences are independent: fetch them concurrently
+            recent_task = asyncio.create_task(self.get_recent_messages(
                 conversation_id=conversation_id,
                 limit=self.short_term_limit
+            ))
+            topic_task = asyncio.create_task(self._get_stored_topic(conversation_id))
+            prefs_task = (
+                asyncio.create_task(self.get_user_preferences(user_id))
+                if user_id else None
             )
 
+            # Get short-term memory (recent messages)
+            recent_messages = await recent_task
+            stored_topic = await topic_task
+
             context = {
                 "recent_messages": recent_messages,
                 "similar_past_conversations": [],
                 "user_preferences": {},
-                "conversation_summary": ""
+                "conversation_summary": "",
+                "memory_pack": "",
+                "memory_pack_version": ""
             }
 
-            # Extract current topic from recent messages
-            current_topic = self._extract_topic(recent_messages)
+            # Topic stored on the last user message, else extracted from recent messages
+            current_topic = stored_topic or self._extract_topic(recent_messages)
             context["conversation_summary"] = current_topic
 
             # Get user preferences if user_id provided
-            if user_id:
-                preferences = await self.get_user_preferences(user_id)
-                context["user_preferences"] = preferences
-
-                # Get long-term memory if requested
+            if prefs_task:
+                # Get long-term memory if requested, overlapping the preferences query
                 if include_long_term and current_topic:
-                    similar_past = await self.search_conversation_history(
-                        user_id=user_id,
-                        query=current_topic,
-                        limit=self.long_term_search_limit,
-                        exclude_conversation_id=conversation_id
-                    )
+                    if stored_topic:
+                        # Stored topic embedding is used server-side: no embedding call
+                        history_search = self._search_history_by_stored_topic(
+                            conversation_id=conversation_id,
+                            user_id=user_id,
+                            topic=stored_topic,
+                            limit=self.long_term_search_limit
+                        )
+                    else:
+                        history_search = self.search_conversation_history(
+                            user_id=user_id,
+                            query=current_topic,
+                            limit=self.long_term_search_limit,
+                            exclude_conversation_id=conversation_id
+                        )
+
+                    preferences, similar_past = await asyncio.gather(prefs_task, history_search)
                     context["similar_past_conversations"] = similar_past
+                else:
+                    preferences = await prefs_task
+
+                context["user_preferences"] = preferences.to_dict()
+
+            context["memory_pack"], context["memory_pack_version"] = self._build_memory_pack(
+                context["similar_past_conversations"]
+            )
 
             logger.info(
                 "Conversation context retrieved",
@@ -123,7 +275,9 @@ class ConversationMemory:
                 "recent_messages": [],
                 "similar_past_conversations": [],
                 "user_preferences": {},
-                "conversation_summary": ""
+                "conversation_summary": "",
+                "memory_pack": "",
+                "memory_pack_version": ""
             }
 
     async def get_recent_messages(
@@ -143,17 +297,20 @@ class ConversationMemory:
         """
 
         try:
-            # Query messages table ordered by timestamp
-            response = await supabase_client.client.table("messages").select(
-                "id, role, content, metadata, created_at"
-            ).eq("conversation_id", conversation_id).order(
-                "created_at", desc=True
-            ).limit(limit).execute()
-
-            messages = response.data if response.data else []
-
-            # Reverse to get chronological order (oldest to newest)
-            messages.reverse()
+            # Last `limit` messages, returned in chronological order (oldest to newest)
+            if supabase_client.pool and limit <= self.MESSAGE_CURSOR_PREFETCH:
+                # Small window: one fetch, no cursor transaction
+                rows = await supabase_client.pool.fetch(
+                    RECENT_MESSAGES_SQL, conversation_id, limit
+                )
+                messages = [_message_from_row(row) for row in rows]
+            else:
+                messages = [
+                    message async for message in self.iter_recent_messages(
+                        conversation_id=conversation_id,
+                        limit=limit
+                    )
+                ]
 
             logger.info(
                 "Retrieved recent messages",
@@ -171,6 +328,49 @@ class ConversationMemory:
             )
             return []
 
+    async def iter_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int = 10
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream recent messages from a conversation, oldest to newest
+
+        With the Postgres pool, rows come from a server-side cursor
+        MESSAGE_CURSOR_PREFETCH at a time, so long windows (summarization)
+        never hold the whole history in memory. Errors propagate.
+
+        Args:
+            conversation_id: Conversation ID
+            limit: Maximum number of messages to stream
+
+        Yields:
+            Message dictionaries
+        """
+
+        if supabase_client.pool:
+            async with supabase_client.pool.acquire() as connection:
+                # Cursors only live inside a transaction
+                async with connection.transaction():
+                    async for row in connection.cursor(
+                        RECENT_MESSAGES_SQL,
+                        conversation_id,
+                        limit,
+                        prefetch=self.MESSAGE_CURSOR_PREFETCH
+                    ):
+                        yield _message_from_row(row)
+        else:
+            response = await supabase_client.client.rpc(
+                "get_recent_messages_asc",
+                {
+                    "p_conversation_id": conversation_id,
+                    "p_limit": limit
+                }
+            ).execute()
+
+            for message in response.data or []:
+                yield message
+
     async def search_conversation_history(
         self,
         user_id: str,
@@ -193,50 +393,27 @@ class ConversationMemory:
             List of similar past conversation excerpts
         """
 
+        cache_key = _long_term_cache_key(
+            user_id, query, exclude_conversation_id, limit, time_window_days
+        )
+        cached = await cache_manager.get_search_results(cache_key, "long_term")
+        if cached is not None:
+            return cached
+
         try:
             # Calculate time window
-            cutoff_date = datetime.utcnow() - timedelta(days=time_window_days)
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=time_window_days)
 
             # Get query embedding
-            query_embedding = await embedding_service.get_embedding(query)
-
-            # Search messages with embeddings (using pgvector similarity)
-            # NOTE: This requires messages.embedding column (see migration)
-            query = f"""
-                SELECT
-                    m.id,
-                    m.conversation_id,
-                    m.role,
-                    m.content,
-                    m.created_at,
-                    c.title as conversation_title,
-                    1 - (m.embedding <=> $1::vector) as similarity
-                FROM messages m
-                JOIN conversations c ON m.conversation_id = c.id
-                WHERE
-                    c.user_id = $2
-                    AND m.created_at > $3
-                    {f"AND m.conversation_id != $4" if exclude_conversation_id else ""}
-                    AND m.embedding IS NOT NULL
-                ORDER BY m.embedding <=> $1::vector
-                LIMIT $5
-            """
-
-            params = [
-                str(query_embedding),
-                user_id,
-                cutoff_date.isoformat(),
-            ]
-
-            if exclude_conversation_id:
-                params.append(exclude_conversation_id)
-
-            params.append(limit)
-
-            # Execute raw SQL query
+            query_embedding = await self._get_query_embedding(query)
+
+            # Hybrid full-text + vector search fused by rank (see migration 013)
+            # query_embedding is passed as a list: serialized as a JSON array,
+            # cast to vector(1536) by the RPC signature
             response = await supabase_client.client.rpc(
-                "search_similar_messages",
+                "search_similar_messages_hybrid",
                 {
+                    "query_text": query,
                     "query_embedding": query_embedding,
                     "p_user_id": user_id,
                     "p_cutoff_date": cutoff_date.isoformat(),
@@ -246,6 +423,9 @@ class ConversationMemory:
             ).execute()
 
             results = response.data if response.data else []
+            await cache_manager.set_search_results(
+                cache_key, "long_term", results, ttl=self.LONG_TERM_CACHE_TTL
+            )
 
             logger.info(
                 "Searched conversation history",
@@ -264,54 +444,185 @@ class ConversationMemory:
             )
             return []
 
-    async def get_user_preferences(self, user_id: str) -> Dict[str, Any]:
+    async def _search_history_by_stored_topic(
+        self,
+        conversation_id: str,
+        user_id: str,
+        topic: str,
+        limit: int = 5,
+        time_window_days: int = 90
+    ) -> List[Dict[str, Any]]:
         """
-        Get user preferences and interaction patterns
+        Search similar past messages using the conversation's stored topic embedding
 
         Args:
+            conversation_id: Current conversation ID (excluded from results)
             user_id: User ID
+            topic: Stored topic (cache key; same results as searching it as a query)
+            limit: Maximum results to return
+            time_window_days: Only search conversations within this time window
 
         Returns:
-            User preferences dictionary
+            List of similar past conversation excerpts
         """
 
+        cache_key = _long_term_cache_key(
+            user_id, topic, conversation_id, limit, time_window_days
+        )
+        cached = await cache_manager.get_search_results(cache_key, "long_term")
+        if cached is not None:
+            return cached
+
         try:
-            # Query user_preferences table
-            response = await supabase_client.client.table("user_preferences").select(
-                "*"
-            ).eq("user_id", user_id).single().execute()
+            cutoff_date = datetime.now(timezone.utc) - timedelta(days=time_window_days)
+
+            # See migration 009
+            response = await supabase_client.client.rpc(
+                "search_similar_messages_by_topic",
+                {
+                    "p_conversation_id": conversation_id,
+                    "p_user_id": user_id,
+                    "p_cutoff_date": cutoff_date.isoformat(),
+                    "p_limit": limit
+                }
+            ).execute()
+
+            results = response.data if response.data else []
+            await cache_manager.set_search_results(
+                cache_key, "long_term", results, ttl=self.LONG_TERM_CACHE_TTL
+            )
+
+            logger.info(
+                "Searched conversation history by stored topic",
+                user_id=user_id,
+                results_found=len(results)
+            )
 
-            if response.data:
-                preferences = response.data
+            return results
+
+        except Exception as e:
+            logger.error(
+                "Failed to search conversation history",
+                user_id=user_id,
+                error=str(e)
+            )
+            return []
+
+    async def _get_stored_topic(self, conversation_id: str) -> str:
+        """
+        Get the topic stored on the conversation by _refresh_conversation_topic
+
+        Returns:
+            Stored topic, or "" if none (older conversations, lookup failure)
+        """
 
-                logger.info("Retrieved user preferences", user_id=user_id)
-                return preferences
+        try:
+            if supabase_client.pool:
+                topic = await supabase_client.pool.fetchval(
+                    CONVERSATION_TOPIC_SQL, conversation_id
+                )
             else:
-                # Create default preferences
-                default_preferences = {
-                    "user_id": user_id,
-                    "preferred_agent": "auto",
-                    "topics_of_interest": [],
-                    "interaction_patterns": {},
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat()
-                }
+                response = await supabase_client.client.table("conversations").select(
+                    "current_topic"
+                ).eq("id", conversation_id).execute()
 
-                # Insert default preferences
-                await supabase_client.client.table("user_preferences").insert(
-                    default_preferences
-                ).execute()
+                topic = response.data[0]["current_topic"] if response.data else None
+
+            return topic or ""
+
+        except Exception as e:
+            logger.warning(
+                "Failed to retrieve conversation topic",
+                conversation_id=conversation_id,
+                error=str(e)
+            )
+            return ""
+
+    async def _get_query_embedding(self, query: str) -> List[float]:
+        """
+        Get embedding for a search query, cached by content hash
+
+        Concurrent calls for the same query share a single embedding request.
 
-                logger.info("Created default user preferences", user_id=user_id)
-                return default_preferences
+        Args:
+            query: Search query
+
+        Returns:
+            Embedding vector
+        """
+
+        key = hashlib.sha256(query.encode()).hexdigest()
+
+        cached = self._query_embedding_cache.get(key)
+        if cached is not None:
+            self._query_embedding_hits += 1
+            logger.debug(
+                "Query embedding cache hit",
+                hits=self._query_embedding_hits,
+                misses=self._query_embedding_misses
+            )
+            return cached
+
+        inflight = self._query_embedding_inflight.get(key)
+        if inflight is not None:
+            self._query_embedding_hits += 1
+            return await asyncio.shield(inflight)
+
+        self._query_embedding_misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._query_embedding_inflight[key] = future
+
+        try:
+            embedding = await embedding_service.get_embedding(query)
+            self._query_embedding_cache.set(key, embedding, ttl=self.QUERY_EMBEDDING_CACHE_TTL)
+            future.set_result(embedding)
+            return embedding
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._query_embedding_inflight[key]
+
+    async def get_user_preferences(self, user_id: str) -> UserPreferences:
+        """
+        Get user preferences and interaction patterns
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            User preferences (defaults if they cannot be retrieved)
+        """
+
+        cached = self._preferences_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        try:
+            # Fetch preferences, creating defaults on first access (one round-trip, see migration 007)
+            # Only the columns read per turn are returned (see migration 014)
+            response = await supabase_client.client.rpc(
+                "get_or_create_user_preferences",
+                {"p_user_id": user_id}
+            ).execute()
+
+            if not response.data:
+                raise Exception("No preferences returned")
+
+            preferences = UserPreferences.from_row(response.data[0])
+            self._preferences_cache.set(user_id, preferences, ttl=self.PREFERENCES_CACHE_TTL)
+
+            logger.info("Retrieved user preferences", user_id=user_id)
+            return preferences
 
         except Exception as e:
             logger.error("Failed to retrieve user preferences", user_id=user_id, error=str(e))
-            return {
-                "preferred_agent": "auto",
-                "topics_of_interest": [],
-                "interaction_patterns": {}
-            }
+            return UserPreferences()
 
     async def update_user_preferences(
         self,
@@ -330,7 +641,7 @@ class ConversationMemory:
         """
 
         try:
-            updates["updated_at"] = datetime.utcnow().isoformat()
+            updates["updated_at"] = datetime.now(timezone.utc).isoformat()
 
             response = await supabase_client.client.table("user_preferences").update(
                 updates
@@ -338,6 +649,9 @@ class ConversationMemory:
 
             success = response.data is not None
 
+            # Other workers keep their copy until PREFERENCES_CACHE_TTL expires
+            self._preferences_cache.delete(user_id)
+
             logger.info(
                 "Updated user preferences",
                 user_id=user_id,
@@ -377,27 +691,46 @@ class ConversationMemory:
         """
 
         try:
-            message_data = {
-                "conversation_id": conversation_id,
-                "role": role,
-                "content": content,
-                "metadata": metadata or {},
-                "created_at": datetime.utcnow().isoformat()
-            }
+            created_at = datetime.now(timezone.utc)
 
             # Insert message
-            response = await supabase_client.client.table("messages").insert(
-                message_data
-            ).execute()
+            if supabase_client.pool:
+                message_id = await supabase_client.pool.fetchval(
+                    INSERT_MESSAGE_SQL,
+                    conversation_id,
+                    role,
+                    content,
+                    metadata or {},
+                    created_at
+                )
+                message_id = str(message_id) if message_id else None
+            else:
+                message_data = {
+                    "conversation_id": conversation_id,
+                    "role": role,
+                    "content": content,
+                    "metadata": metadata or {},
+                    "created_at": created_at.isoformat()
+                }
+
+                response = await supabase_client.client.table("messages").insert(
+                    message_data
+                ).execute()
 
-            if response.data and len(response.data) > 0:
-                message_id = response.data[0]["id"]
+                message_id = response.data[0]["id"] if response.data else None
 
-                # Create embedding asynchronously if requested
+            if message_id:
+                # Queue embedding creation (batched in background) if requested
                 if create_embedding and content.strip():
-                    asyncio.create_task(
-                        self._create_message_embedding(message_id, content)
+                    self._create_message_embedding(message_id, content)
+
+                # Only user messages change the topic: refresh it in background
+                if role == "user":
+                    task = asyncio.create_task(
+                        self._refresh_conversation_topic(conversation_id)
                     )
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
 
                 logger.info(
                     "Message stored",
@@ -419,33 +752,199 @@ class ConversationMemory:
             )
             return None
 
-    async def _create_message_embedding(self, message_id: str, content: str):
+    def _create_message_embedding(self, message_id: str, content: str):
         """
-        Create and store embedding for a message (for long-term memory RAG)
+        Queue embedding creation for a message (for long-term memory RAG)
+
+        Messages queued within EMBEDDING_BATCH_WINDOW share one embeddings
+        API call and one database update (see _embedding_worker).
 
         Args:
             message_id: Message ID
             content: Message content
         """
 
+        loop = asyncio.get_running_loop()
+        if (
+            self._embedding_loop is not loop
+            or self._embedding_worker_task is None
+            or self._embedding_worker_task.done()
+        ):
+            self._embedding_queue = asyncio.Queue()
+            self._embedding_loop = loop
+            self._embedding_worker_task = asyncio.create_task(
+                self._embedding_worker(self._embedding_queue)
+            )
+
+        self._embedding_queue.put_nowait((message_id, content))
+
+    async def _embedding_worker(self, queue: asyncio.Queue):
+        """
+        Coalesce embedding requests arriving within EMBEDDING_BATCH_WINDOW
+        """
+
+        while True:
+            batch = [await queue.get()]
+
+            # Give concurrent writes a short window to join the batch
+            await asyncio.sleep(self.EMBEDDING_BATCH_WINDOW)
+            while len(batch) < self.EMBEDDING_BATCH_MAX_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            await self._store_message_embeddings(batch)
+
+    async def _store_message_embeddings(self, batch: List[Tuple[str, str]]):
+        """
+        Embed a batch of messages and store all vectors in one update
+
+        Args:
+            batch: List of (message_id, content) tuples
+        """
+
+        message_ids = [message_id for message_id, _ in batch]
+
+        try:
+            embeddings = await embedding_service.batch_embeddings(
+                [content for _, content in batch]
+            )
+
+            # Single multi-row UPDATE (see migration 006)
+            await supabase_client.client.rpc(
+                "update_message_embeddings",
+                {
+                    "p_ids": message_ids,
+                    "p_embeddings": embeddings
+                }
+            ).execute()
+
+            logger.info("Message embeddings created", count=len(batch))
+
+        except Exception as e:
+            logger.error(
+                "Failed to create message embeddings",
+                message_ids=message_ids,
+                error=str(e)
+            )
+
+    async def _refresh_conversation_topic(self, conversation_id: str):
+        """
+        Recompute and store the conversation topic and its embedding
+
+        Runs after each user message so get_conversation_context reads a
+        ready topic instead of rebuilding and re-embedding it every turn.
+
+        Args:
+            conversation_id: Conversation ID
+        """
+
         try:
-            # Get embedding
-            embedding = await embedding_service.get_embedding(content)
+            recent_messages = await self.get_recent_messages(
+                conversation_id=conversation_id,
+                limit=self.short_term_limit
+            )
+
+            topic = self._extract_topic(recent_messages)
+            if not topic:
+                return
+
+            embedding = await self._get_query_embedding(topic)
 
-            # Update message with embedding
-            await supabase_client.client.table("messages").update({
-                "embedding": embedding
-            }).eq("id", message_id).execute()
+            await supabase_client.client.table("conversations").update({
+                "current_topic": topic,
+                "current_topic_embedding": embedding
+            }).eq("id", conversation_id).execute()
 
-            logger.info("Message embedding created", message_id=message_id)
+            logger.debug("Conversation topic refreshed", conversation_id=conversation_id)
 
         except Exception as e:
             logger.error(
-                "Failed to create message embedding",
-                message_id=message_id,
+                "Failed to refresh conversation topic",
+                conversation_id=conversation_id,
                 error=str(e)
             )
 
+    async def _embedding_backfill_loop(self):
+        """Background task embedding messages left without embedding (failures, history)"""
+        while True:
+            try:
+                await asyncio.sleep(self.EMBEDDING_BACKFILL_INTERVAL)
+
+                # Drain the backlog batch by batch, then wait for the next pass
+                while await self._backfill_embeddings_batch() == self.EMBEDDING_BACKFILL_BATCH_SIZE:
+                    pass
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Embedding backfill failed", error=str(e))
+
+    async def _backfill_embeddings_batch(self) -> int:
+        """
+        Claim, embed and store one batch of messages without embedding
+
+        Rows stay locked (FOR UPDATE SKIP LOCKED) until the update commits,
+        so concurrent workers pick disjoint batches. The transaction, and a
+        pooled connection, are held across the OpenAI call: the call is
+        bounded by EMBEDDING_BACKFILL_LOCK_TIMEOUT (the batch rolls back and
+        is picked up by the next pass), and the server aborts the transaction
+        if the client stays idle in it for twice that.
+
+        Returns:
+            Number of messages embedded
+        """
+
+        async with supabase_client.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.execute(
+                    f"SET LOCAL idle_in_transaction_session_timeout = "
+                    f"'{self.EMBEDDING_BACKFILL_LOCK_TIMEOUT * 2}s'"
+                )
+                rows = await connection.fetch(
+                    MISSING_EMBEDDINGS_SQL, self.EMBEDDING_BACKFILL_BATCH_SIZE
+                )
+                if not rows:
+                    return 0
+
+                embeddings = await asyncio.wait_for(
+                    embedding_service.batch_embeddings([row["content"] for row in rows]),
+                    timeout=self.EMBEDDING_BACKFILL_LOCK_TIMEOUT
+                )
+
+                await connection.execute(
+                    UPDATE_EMBEDDINGS_SQL,
+                    [row["id"] for row in rows],
+                    embeddings
+                )
+
+        logger.info("Backfilled message embeddings", count=len(rows))
+        return len(rows)
+
+    @staticmethod
+    def _build_memory_pack(similar_past: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        Render long-term memory as a canonical, versioned text block
+
+        Excerpts are ordered by message ID, not similarity, so the same set
+        of memories always renders to the same text. Injected verbatim into
+        a prompt, it keeps the provider-side prompt cache valid across turns.
+
+        Args:
+            similar_past: Results of the long-term memory search
+
+        Returns:
+            (pack_text, version) - version is a short hash of pack_text
+        """
+
+        if not similar_past:
+            return "", ""
+
+        pack_text = "\n".join(
+            f"- {message.get('content', '')}"
+            for message in sorted(similar_past, key=lambda message: str(message.get("id", "")))
+        )
+        version = hashlib.md5(pack_text.encode()).hexdigest()[:8]
+
+        return pack_text, version
+
     def _extract_topic(self, messages: List[Dict[str, Any]]) -> str:
         """
         Extract current conversation topic from recent messages
@@ -470,15 +969,68 @@ class ConversationMemory:
         if not user_messages:
             return ""
 
-        # Take last 3 user messages and join
-        recent_topics = " ".join(user_messages[-3:])
+        # Take last 3 user messages and join, keeping the most recent part
+        return _truncate_topic(" ".join(user_messages[-3:]))
+
 
-        # Truncate if too long
-        max_length = 200
-        if len(recent_topics) > max_length:
-            recent_topics = recent_topics[:max_length] + "..."
+def _truncate_topic(text: str) -> str:
+    """
+    Keep the trailing whole sentences of text that fit the topic budget
+
+    The budget is TOPIC_MAX_TOKENS tokens (TOPIC_MAX_CHARS characters without
+    tiktoken). A last sentence longer than the budget is cut to its tail.
+    """
 
-        return recent_topics
+    encoder = get_token_encoder()
+    if encoder is not None:
+        budget = TOPIC_MAX_TOKENS
+        measure = lambda chunk: len(encoder.encode(chunk))
+    else:
+        budget = TOPIC_MAX_CHARS
+        measure = len
+
+    if measure(text) <= budget:
+        return text
+
+    kept = []
+    used = 0
+    for sentence in reversed(_SENTENCE_SPLIT_RE.split(text)):
+        # +1 approximates the joining space
+        cost = measure(sentence) + (1 if kept else 0)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+
+    if kept:
+        return " ".join(reversed(kept))
+
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text)[-budget:])
+    return text[-budget:]
+
+
+def _long_term_cache_key(
+    user_id: str,
+    topic: str,
+    exclude_conversation_id: Optional[str],
+    limit: int,
+    time_window_days: int
+) -> str:
+    """Cache key of a long-term memory search (both search paths share it)"""
+    topic_hash = hashlib.blake2b(topic.encode(), digest_size=16).hexdigest()
+    return f"{user_id}:{exclude_conversation_id or '-'}:{limit}:{time_window_days}:{topic_hash}"
+
+
+def _message_from_row(row) -> Dict[str, Any]:
+    """Convert an asyncpg message row to the PostgREST dict shape (string id and timestamp)"""
+    return {
+        "id": str(row["id"]),
+        "role": row["role"],
+        "content": row["content"],
+        "metadata": row["metadata"],
+        "created_at": row["created_at"].isoformat()
+    }
 
 
 # Global memory service instance
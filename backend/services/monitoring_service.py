@@ -4,18 +4,31 @@ Real-time metrics, performance tracking, and system health monitoring
 """
 
 import asyncio
+import bisect
+import numpy as np
 import psutil
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from collections import defaultdict, deque
+from itertools import islice
 import json
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    # Fallback to asdict() + isoformat()
+    ORJSON_AVAILABLE = False
+
 from services.storage import supabase_client
 from config import get_settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class SystemMetrics:
     """System performance metrics"""
     timestamp: datetime
@@ -28,7 +41,7 @@ class SystemMetrics:
     network_sent_mb: float
     network_recv_mb: float
 
-@dataclass
+@dataclass(slots=True)
 class APIMetrics:
     """API performance metrics"""
     timestamp: datetime
@@ -40,7 +53,7 @@ class APIMetrics:
     active_connections: int
     cache_hit_rate: float
 
-@dataclass
+@dataclass(slots=True)
 class ServiceMetrics:
     """Service-specific metrics"""
     timestamp: datetime
@@ -52,7 +65,7 @@ class ServiceMetrics:
     last_error: Optional[str] = None
     uptime_minutes: float = 0
 
-@dataclass
+@dataclass(slots=True)
 class Alert:
     """System alert"""
     id: str
@@ -63,6 +76,17 @@ class Alert:
     timestamp: datetime
     resolved: bool = False
     resolved_at: Optional[datetime] = None
+    occurrences: int = 1  # Repeats coalesced into this alert (in memory only)
+
+def _read_system_stats():
+    """Read CPU, memory, disk and network counters (blocking syscalls)"""
+    return (
+        # Non-blocking: CPU usage since the previous call (primed in start_monitoring)
+        psutil.cpu_percent(interval=None),
+        psutil.virtual_memory(),
+        psutil.disk_usage('/'),
+        psutil.net_io_counters()
+    )
 
 class MonitoringService:
     """
@@ -75,19 +99,42 @@ class MonitoringService:
         self.supabase = supabase_client
 
         # Metrics storage (in-memory for real-time, DB for persistence)
+        # (metrics, asdict(metrics)) pairs: the dict form is built once, not per read
         self.system_metrics_history = deque(maxlen=1440)  # 24 hours at 1min intervals
         self.api_metrics_history = deque(maxlen=1440)
         self.service_metrics_history = defaultdict(lambda: deque(maxlen=1440))
         self.alerts = deque(maxlen=100)
-
-        # Service tracking
+        # Unresolved alerts in self.alerts, kept up to date on create/resolve/evict
+        self._active_alert_count = 0
+        self._critical_alert_count = 0
+        # Latest alert per type: repeats within alert_coalesce_window update it in place
+        self._active_alert_by_type: Dict[str, Alert] = {}
+        self.alert_coalesce_window = 900  # seconds
+
+        # Service tracking: one array slot per service (structure of arrays)
         self.service_start_times = {}
-        self.service_stats = defaultdict(lambda: {
-            'requests': 0,
-            'errors': 0,
-            'total_time': 0,
-            'last_request': None
-        })
+        self._svc_index: Dict[str, int] = {
+            name: i for i, name in enumerate(['upload', 'chat', 'search', 'rag', 'embedding', 'realtime'])
+        }
+        self._svc_requests = np.zeros(len(self._svc_index), dtype=np.int64)
+        self._svc_errors = np.zeros(len(self._svc_index), dtype=np.int64)
+        self._svc_total_time = np.zeros(len(self._svc_index), dtype=np.float64)
+        self._svc_last_request_ts = np.zeros(len(self._svc_index), dtype=np.float64)  # 0 = never
+        # Requests recorded since the last drain: (processing_time, success, wall-clock ts).
+        # A ring that fills up between drains is folded on the spot (see track_service_request)
+        self.service_ring_size = 4096
+        self._svc_ring = defaultdict(lambda: deque(maxlen=self.service_ring_size))
+        self.service_drain_interval = 5  # seconds
+
+        # Rows waiting to be inserted in batch (see _flush_buffers)
+        self._metrics_buffer: List[Dict[str, Any]] = []
+        self._alerts_buffer: List[Dict[str, Any]] = []
+        self.flush_interval = 60  # seconds
+        self.flush_max_rows = 500
+        self._tasks: List[asyncio.Task] = []
+        self._system_ticks = 0  # System metrics collections since start
+        self.persist_every_ticks = 5  # Persist one system metric out of 5 (every 5 minutes)
+        self._flush_tasks: set = set()  # In-flight inserts (see _start_flush)
 
         # Thresholds for alerts
         self.thresholds = {
@@ -99,106 +146,142 @@ class MonitoringService:
             'cache_hit_rate_low': 30.0  # %
         }
 
+        # Last dashboard payload: (time.monotonic() when built, payload)
+        self._dashboard_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self.dashboard_cache_ttl = 1.0  # seconds
+
+        # Estimated costs (mock data): per-request API costs and fixed monthly costs
+        self._cost_providers = ('openai_api', 'claude_api', 'perplexity_api')
+        self._cost_per_request = np.array([0.002, 0.003, 0.001])  # $ per request estimate
+        self._fixed_costs = {'supabase': 25.0, 'redis': 15.0, 'hosting': 20.0}  # Fixed monthly
+        self._fixed_costs_total = sum(self._fixed_costs.values())
+        self._cost_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        self.cost_cache_ttl = 60.0  # seconds
+
+        # Health score weights: cpu, memory, disk, response_time, error_rate, cache
+        self._health_weights = np.array([0.2, 0.2, 0.15, 0.2, 0.15, 0.1])
+
     async def start_monitoring(self):
         """Start background monitoring tasks"""
-        asyncio.create_task(self._collect_system_metrics())
-        asyncio.create_task(self._collect_api_metrics())
-        asyncio.create_task(self._check_service_health())
-        asyncio.create_task(self._process_alerts())
-
-        print("✅ Monitoring service started")
+        # Prime the CPU counter: later non-blocking calls measure since the previous one
+        psutil.cpu_percent(interval=None)
+
+        self._tasks = [asyncio.create_task(self._scheduler())]
+
+        logger.info("Monitoring service started")
+
+    async def stop_monitoring(self):
+        """Stop background tasks and persist buffered rows"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._flush_tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Drain buffers so rows collected since the last flush are not lost
+        await self._flush_buffers()
+
+        logger.info("Monitoring service stopped")
+
+    async def _scheduler(self):
+        """
+        Run every periodic job from a single task
+
+        Sleeps until the earliest due job instead of keeping one timer per
+        job, then runs the due jobs one after another.
+        """
+        jobs = [
+            (60, self._collect_system_metrics),   # Every minute
+            (60, self._collect_api_metrics),
+            (120, self._check_service_health),    # Every 2 minutes
+            (300, self._process_alerts),          # Every 5 minutes
+            (self.service_drain_interval, self._drain_service_requests),
+            (self.flush_interval, self._flush_in_background)
+        ]
+        # Collectors run immediately, the flush waits for rows to accumulate
+        now = time.monotonic()
+        next_due = [now] * (len(jobs) - 1) + [now + self.flush_interval]
 
-    async def _collect_system_metrics(self):
-        """Collect system performance metrics every minute"""
         while True:
-            try:
-                # Get system metrics
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                disk = psutil.disk_usage('/')
-                network = psutil.net_io_counters()
-
-                metrics = SystemMetrics(
-                    timestamp=datetime.now(),
-                    cpu_percent=cpu_percent,
-                    memory_percent=memory.percent,
-                    memory_used_mb=memory.used / 1024 / 1024,
-                    memory_total_mb=memory.total / 1024 / 1024,
-                    disk_usage_percent=(disk.total - disk.free) / disk.total * 100,
-                    disk_free_gb=disk.free / 1024 / 1024 / 1024,
-                    network_sent_mb=network.bytes_sent / 1024 / 1024,
-                    network_recv_mb=network.bytes_recv / 1024 / 1024
-                )
+            now = time.monotonic()
+            for i, (interval, job) in enumerate(jobs):
+                if next_due[i] > now:
+                    continue
+                try:
+                    await job()
+                except Exception as e:
+                    logger.error("Monitoring job failed", job=job.__name__, error=str(e))
+                next_due[i] = now + interval
+
+            await asyncio.sleep(max(0.0, min(next_due) - time.monotonic()))
 
-                self.system_metrics_history.append(metrics)
+    async def _collect_system_metrics(self):
+        """Collect system performance metrics"""
+        # statfs and /proc reads can stall under load: one thread hop for all of them
+        cpu_percent, memory, disk, network = await asyncio.to_thread(_read_system_stats)
+
+        metrics = SystemMetrics(
+            timestamp=datetime.now(),
+            cpu_percent=cpu_percent,
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / 1024 / 1024,
+            memory_total_mb=memory.total / 1024 / 1024,
+            disk_usage_percent=(disk.total - disk.free) / disk.total * 100,
+            disk_free_gb=disk.free / 1024 / 1024 / 1024,
+            network_sent_mb=network.bytes_sent / 1024 / 1024,
+            network_recv_mb=network.bytes_recv / 1024 / 1024
+        )
 
-                # Check for alerts
-                await self._check_system_alerts(metrics)
+        self.system_metrics_history.append((metrics, asdict(metrics)))
 
-                # Store in database every 5 minutes
-                if len(self.system_metrics_history) % 5 == 0:
-                    await self._persist_system_metrics(metrics)
+        # Check for alerts
+        await self._check_system_alerts(metrics)
 
-            except Exception as e:
-                print(f"Error collecting system metrics: {e}")
-
-            await asyncio.sleep(60)  # Every minute
+        # Store in database every 5 minutes (the history length stops growing at maxlen)
+        self._system_ticks += 1
+        if self._system_ticks % self.persist_every_ticks == 0:
+            await self._persist_system_metrics(metrics)
 
     async def _collect_api_metrics(self):
         """Collect API performance metrics"""
-        while True:
-            try:
-                # Get metrics from performance middleware
-                # This would integrate with the performance middleware
-
-                # Mock data for now - in real implementation, get from middleware
-                metrics = APIMetrics(
-                    timestamp=datetime.now(),
-                    requests_total=len(self.system_metrics_history) * 10,  # Mock
-                    requests_per_minute=10.0,
-                    avg_response_time_ms=150.0,
-                    p95_response_time_ms=300.0,
-                    error_rate=1.5,
-                    active_connections=5,
-                    cache_hit_rate=75.0
-                )
-
-                self.api_metrics_history.append(metrics)
+        # Get metrics from performance middleware
+        # This would integrate with the performance middleware
+
+        # Mock data for now - in real implementation, get from middleware
+        metrics = APIMetrics(
+            timestamp=datetime.now(),
+            requests_total=len(self.system_metrics_history) * 10,  # Mock
+            requests_per_minute=10.0,
+            avg_response_time_ms=150.0,
+            p95_response_time_ms=300.0,
+            error_rate=1.5,
+            active_connections=5,
+            cache_hit_rate=75.0
+        )
 
-                # Check for API alerts
-                await self._check_api_alerts(metrics)
+        self.api_metrics_history.append((metrics, asdict(metrics)))
 
-            except Exception as e:
-                print(f"Error collecting API metrics: {e}")
-
-            await asyncio.sleep(60)
+        # Check for API alerts
+        await self._check_api_alerts(metrics)
 
     async def _check_service_health(self):
         """Check health of all services"""
         services = ['upload', 'chat', 'search', 'rag', 'embedding', 'realtime']
 
-        while True:
-            try:
-                for service in services:
-                    health = await self._check_individual_service(service)
-
-                    service_metrics = ServiceMetrics(
-                        timestamp=datetime.now(),
-                        service_name=service,
-                        status=health['status'],
-                        requests_count=health.get('requests', 0),
-                        success_rate=health.get('success_rate', 100.0),
-                        avg_processing_time_ms=health.get('avg_time', 100.0),
-                        last_error=health.get('last_error'),
-                        uptime_minutes=health.get('uptime', 0)
-                    )
-
-                    self.service_metrics_history[service].append(service_metrics)
-
-            except Exception as e:
-                print(f"Error checking service health: {e}")
+        for service in services:
+            health = await self._check_individual_service(service)
+
+            service_metrics = ServiceMetrics(
+                timestamp=datetime.now(),
+                service_name=service,
+                status=health['status'],
+                requests_count=health.get('requests', 0),
+                success_rate=health.get('success_rate', 100.0),
+                avg_processing_time_ms=health.get('avg_time', 100.0),
+                last_error=health.get('last_error'),
+                uptime_minutes=health.get('uptime', 0)
+            )
 
-            await asyncio.sleep(120)  # Every 2 minutes
+            self.service_metrics_history[service].append(service_metrics)
 
     async def _check_individual_service(self, service_name: str) -> Dict[str, Any]:
         """Check health of individual service"""
@@ -206,7 +289,7 @@ class MonitoringService:
             # Mock health check - in real implementation, ping actual services
             return {
                 'status': 'healthy',
-                'requests': self.service_stats[service_name]['requests'],
+                'requests': int(self._svc_requests[self._service_slot(service_name)] + len(self._svc_ring[service_name])),
                 'success_rate': 98.5,
                 'avg_time': 120.0,
                 'uptime': 1440  # minutes
@@ -285,7 +368,19 @@ class MonitoringService:
             )
 
     async def _create_alert(self, type: str, severity: str, message: str, details: Dict[str, Any]):
-        """Create new alert"""
+        """Create new alert, or fold a repeat into the active alert of the same type"""
+        current = self._active_alert_by_type.get(type)
+        if (
+            current is not None
+            and not current.resolved
+            and current.severity == severity
+            and (datetime.now() - current.timestamp).total_seconds() < self.alert_coalesce_window
+        ):
+            current.message = message
+            current.details = details
+            current.occurrences += 1
+            return
+
         alert = Alert(
             id=f"{type}_{int(time.time())}",
             type=type,
@@ -295,33 +390,44 @@ class MonitoringService:
             timestamp=datetime.now()
         )
 
+        # The oldest alert falls out of the deque: stop counting it
+        if len(self.alerts) == self.alerts.maxlen:
+            evicted = self.alerts[0]
+            self._uncount_alert(evicted)
+            if self._active_alert_by_type.get(evicted.type) is evicted:
+                del self._active_alert_by_type[evicted.type]
+
         self.alerts.append(alert)
+        self._active_alert_by_type[type] = alert
+        self._active_alert_count += 1
+        if severity == 'critical':
+            self._critical_alert_count += 1
 
         # Log alert
-        print(f"🚨 ALERT [{severity.upper()}]: {message}")
+        logger.warning("Alert raised", type=type, severity=severity, message=message)
 
-        # Store in database
-        try:
-            await self.supabase.table('alerts').insert(asdict(alert)).execute()
-        except Exception as e:
-            print(f"Failed to store alert: {e}")
+        # Store in database (batched). The row is inserted once, before any
+        # repeat is folded in: occurrences is only tracked in memory
+        self._buffer_row(self._alerts_buffer, alert, exclude=('occurrences',))
 
     async def _process_alerts(self):
         """Process and manage alerts"""
-        while True:
-            try:
-                # Auto-resolve alerts that are no longer relevant
-                current_time = datetime.now()
-
-                for alert in self.alerts:
-                    if not alert.resolved and self._should_auto_resolve(alert, current_time):
-                        alert.resolved = True
-                        alert.resolved_at = current_time
+        # Auto-resolve alerts that are no longer relevant
+        current_time = datetime.now()
 
-            except Exception as e:
-                print(f"Error processing alerts: {e}")
+        for alert in self.alerts:
+            if not alert.resolved and self._should_auto_resolve(alert, current_time):
+                self._uncount_alert(alert)
+                alert.resolved = True
+                alert.resolved_at = current_time
 
-            await asyncio.sleep(300)  # Every 5 minutes
+    def _uncount_alert(self, alert: Alert):
+        """Remove an unresolved alert from the active counters"""
+        if alert.resolved:
+            return
+        self._active_alert_count -= 1
+        if alert.severity == 'critical':
+            self._critical_alert_count -= 1
 
     def _should_auto_resolve(self, alert: Alert, current_time: datetime) -> bool:
         """Check if alert should be auto-resolved"""
@@ -335,34 +441,131 @@ class MonitoringService:
         return False
 
     async def _persist_system_metrics(self, metrics: SystemMetrics):
-        """Store system metrics in database"""
-        try:
-            await self.supabase.table('system_metrics').insert(asdict(metrics)).execute()
-        except Exception as e:
-            print(f"Failed to persist system metrics: {e}")
+        """Store system metrics in database (batched)"""
+        self._buffer_row(self._metrics_buffer, metrics)
+
+    def _buffer_row(self, buffer: List[Dict[str, Any]], record: Any, exclude: Tuple[str, ...] = ()):
+        """Queue a dataclass record for the next batch insert (minus the excluded fields)"""
+        row = self._to_row(record)
+        for key in exclude:
+            row.pop(key, None)
+        buffer.append(row)
+
+        # Flush early rather than letting a burst grow the buffer unbounded
+        if len(buffer) >= self.flush_max_rows:
+            self._start_flush()
+
+    @staticmethod
+    def _to_row(record: Any) -> Dict[str, Any]:
+        """Convert a dataclass record to a JSON-ready row (datetimes as ISO strings)"""
+        if ORJSON_AVAILABLE:
+            # Dataclass and datetime encoding both happen in C
+            return orjson.loads(orjson.dumps(record, option=orjson.OPT_SERIALIZE_DATACLASS))
+        return {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in asdict(record).items()
+        }
+
+    async def _flush_in_background(self):
+        """Scheduler job: start a flush without waiting for the database"""
+        self._start_flush()
+
+    def _start_flush(self):
+        """Run _flush_buffers as a tracked task so collectors never wait on inserts"""
+        task = asyncio.create_task(self._flush_buffers())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_buffers(self):
+        """Insert buffered metrics and alerts, one request per table"""
+        for table, buffer in (('system_metrics', self._metrics_buffer), ('alerts', self._alerts_buffer)):
+            if not buffer:
+                continue
+
+            # Swap out the rows first: appends during the insert go to the next batch
+            rows = buffer[:]
+            buffer.clear()
+
+            try:
+                # supabase-py is synchronous: keep the HTTP request off the event loop
+                await asyncio.to_thread(
+                    lambda: self.supabase.client.table(table).insert(rows).execute()
+                )
+            except Exception as e:
+                logger.error("Failed to persist monitoring rows", table=table, rows=len(rows), error=str(e))
 
     # Public API methods
 
-    def track_service_request(self, service_name: str, processing_time: float, success: bool):
-        """Track service request for metrics"""
-        stats = self.service_stats[service_name]
-        stats['requests'] += 1
-        stats['total_time'] += processing_time
-        stats['last_request'] = datetime.now()
+    def _service_slot(self, service_name: str) -> int:
+        """Return the array index of a service, growing the arrays for a new one"""
+        index = self._svc_index.get(service_name)
+        if index is None:
+            index = self._svc_index[service_name] = len(self._svc_index)
+            size = len(self._svc_index)
+            self._svc_requests = np.resize(self._svc_requests, size)
+            self._svc_errors = np.resize(self._svc_errors, size)
+            self._svc_total_time = np.resize(self._svc_total_time, size)
+            self._svc_last_request_ts = np.resize(self._svc_last_request_ts, size)
+            self._svc_requests[index] = self._svc_errors[index] = 0
+            self._svc_total_time[index] = self._svc_last_request_ts[index] = 0.0
+        return index
 
-        if not success:
-            stats['errors'] += 1
+    def track_service_request(self, service_name: str, processing_time: float, success: bool):
+        """Track service request for metrics (folded into the counters by _drain_service_requests)"""
+        ring = self._svc_ring[service_name]
+        if len(ring) >= self.service_ring_size:
+            # Faster than the drain interval can absorb: fold now rather than
+            # let the deque drop the oldest requests from the counters
+            self._fold_service_ring(service_name, ring)
+        ring.append((processing_time, success, time.time()))
+
+    async def _drain_service_requests(self):
+        """Fold the recorded requests into the per-service counters"""
+        self._fold_service_requests()
+
+    def _fold_service_requests(self):
+        """Drain every service ring into the counter arrays (single consumer, no lock)"""
+        for service_name, ring in self._svc_ring.items():
+            self._fold_service_ring(service_name, ring)
+
+    def _fold_service_ring(self, service_name: str, ring: deque):
+        """Drain one service ring into its counters"""
+        if not ring:
+            return
+
+        batch = [ring.popleft() for _ in range(len(ring))]
+        index = self._service_slot(service_name)
+        self._svc_requests[index] += len(batch)
+        self._svc_total_time[index] += sum(entry[0] for entry in batch)
+        self._svc_errors[index] += sum(1 for entry in batch if not entry[1])
+        self._svc_last_request_ts[index] = batch[-1][2]
 
     def get_dashboard_data(self) -> Dict[str, Any]:
-        """Get comprehensive dashboard data"""
+        """
+        Get comprehensive dashboard data
+
+        Returns a shallow copy of a payload cached for dashboard_cache_ttl:
+        the nested dicts are shared with the cache and must not be mutated.
+        """
+        # Metrics change at most once a minute: serve concurrent pollers the same payload
+        now = time.monotonic()
+        if self._dashboard_cache and now - self._dashboard_cache[0] < self.dashboard_cache_ttl:
+            return dict(self._dashboard_cache[1])
+
         current_time = datetime.now()
 
-        # Get latest metrics
-        latest_system = self.system_metrics_history[-1] if self.system_metrics_history else None
-        latest_api = self.api_metrics_history[-1] if self.api_metrics_history else None
+        # Get latest metrics (precomputed dict form)
+        latest_system = self.system_metrics_history[-1][1] if self.system_metrics_history else None
+        latest_api = self.api_metrics_history[-1][1] if self.api_metrics_history else None
 
-        # Active alerts
-        active_alerts = [alert for alert in self.alerts if not alert.resolved]
+        # Five most recent active alerts, oldest first: scan back from the newest
+        recent_alerts = []
+        for alert in reversed(self.alerts):
+            if len(recent_alerts) == 5:
+                break
+            if not alert.resolved:
+                recent_alerts.append(alert)
+        recent_alerts.reverse()
 
         # Service statuses
         service_statuses = {}
@@ -374,33 +577,29 @@ class MonitoringService:
                 'success_rate': latest.success_rate if latest else 0
             }
 
-        return {
+        dashboard = {
             'timestamp': current_time.isoformat(),
-            'system': asdict(latest_system) if latest_system else None,
-            'api': asdict(latest_api) if latest_api else None,
+            'system': latest_system,
+            'api': latest_api,
             'services': service_statuses,
             'alerts': {
-                'active_count': len(active_alerts),
-                'critical_count': len([a for a in active_alerts if a.severity == 'critical']),
-                'recent': [asdict(alert) for alert in list(active_alerts)[-5:]]
+                'active_count': self._active_alert_count,
+                'critical_count': self._critical_alert_count,
+                'recent': [asdict(alert) for alert in recent_alerts]
             },
             'health_score': self._calculate_health_score()
         }
 
+        self._dashboard_cache = (now, dashboard)
+        return dict(dashboard)
+
     def get_metrics_history(self, hours: int = 24) -> Dict[str, List[Dict]]:
         """Get historical metrics"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
 
         # Filter metrics by time
-        system_metrics = [
-            asdict(m) for m in self.system_metrics_history
-            if m.timestamp > cutoff_time
-        ]
-
-        api_metrics = [
-            asdict(m) for m in self.api_metrics_history
-            if m.timestamp > cutoff_time
-        ]
+        system_metrics = [row for _, row in self._metrics_since(self.system_metrics_history, cutoff_time)]
+        api_metrics = [row for _, row in self._metrics_since(self.api_metrics_history, cutoff_time)]
 
         return {
             'system': system_metrics,
@@ -408,75 +607,90 @@ class MonitoringService:
             'timerange_hours': hours
         }
 
+    @staticmethod
+    def _metrics_since(history: deque, cutoff_time: datetime):
+        """
+        Iterate over the (metrics, dict) entries of history newer than cutoff_time
+
+        Metrics are appended in timestamp order, so the cutoff is found by
+        binary search and only the matching tail is visited.
+        """
+        start = bisect.bisect_right(history, cutoff_time, key=lambda entry: entry[0].timestamp)
+        return islice(history, start, None)
+
     def get_service_analytics(self) -> Dict[str, Any]:
         """Get service performance analytics"""
-        analytics = {}
-
-        for service, stats in self.service_stats.items():
-            total_requests = stats['requests']
-            total_errors = stats['errors']
-            total_time = stats['total_time']
-
-            analytics[service] = {
-                'total_requests': total_requests,
-                'error_rate': (total_errors / max(total_requests, 1)) * 100,
-                'avg_response_time_ms': total_time / max(total_requests, 1),
-                'success_rate': ((total_requests - total_errors) / max(total_requests, 1)) * 100,
-                'last_request': stats['last_request'].isoformat() if stats['last_request'] else None
-            }
+        # Include requests recorded since the last scheduled drain
+        self._fold_service_requests()
+
+        # Rates for every service in one vectorized pass
+        divisor = np.maximum(self._svc_requests, 1)
+        error_rates = self._svc_errors / divisor * 100
+        avg_times = self._svc_total_time / divisor
+        success_rates = (self._svc_requests - self._svc_errors) / divisor * 100
 
-        return analytics
+        return {
+            service: {
+                'total_requests': int(self._svc_requests[i]),
+                'error_rate': float(error_rates[i]),
+                'avg_response_time_ms': float(avg_times[i]),
+                'success_rate': float(success_rates[i]),
+                'last_request': (
+                    datetime.fromtimestamp(self._svc_last_request_ts[i]).isoformat()
+                    if self._svc_last_request_ts[i] else None
+                )
+            }
+            for service, i in self._svc_index.items()
+        }
 
     def _calculate_health_score(self) -> float:
         """Calculate overall system health score (0-100)"""
         if not self.system_metrics_history or not self.api_metrics_history:
             return 50.0  # Unknown state
 
-        latest_system = self.system_metrics_history[-1]
-        latest_api = self.api_metrics_history[-1]
-
-        # Health factors (weighted)
-        factors = {
-            'cpu': max(0, 100 - latest_system.cpu_percent),  # Lower CPU is better
-            'memory': max(0, 100 - latest_system.memory_percent),
-            'disk': min(100, latest_system.disk_free_gb * 10),  # Scale disk space
-            'response_time': max(0, 100 - (latest_api.avg_response_time_ms / 20)),
-            'error_rate': max(0, 100 - latest_api.error_rate * 10),
-            'cache': latest_api.cache_hit_rate
-        }
-
-        weights = {
-            'cpu': 0.2,
-            'memory': 0.2,
-            'disk': 0.15,
-            'response_time': 0.2,
-            'error_rate': 0.15,
-            'cache': 0.1
-        }
-
-        health_score = sum(factors[key] * weights[key] for key in factors)
+        latest_system = self.system_metrics_history[-1][0]
+        latest_api = self.api_metrics_history[-1][0]
+
+        # Health factors, in self._health_weights order
+        factors = np.array([
+            100 - latest_system.cpu_percent,  # Lower CPU is better
+            100 - latest_system.memory_percent,
+            latest_system.disk_free_gb * 10,  # Scale disk space
+            100 - latest_api.avg_response_time_ms / 20,
+            100 - latest_api.error_rate * 10,
+            latest_api.cache_hit_rate
+        ])
+        # Floor every factor but cache at 0, cap disk at 100
+        factors[:5] = np.maximum(factors[:5], 0)
+        factors[2] = min(factors[2], 100)
+
+        health_score = float(factors @ self._health_weights)
         return min(100, max(0, health_score))
 
     async def get_cost_analytics(self) -> Dict[str, Any]:
-        """Get cost analytics and projections"""
+        """
+        Get cost analytics and projections
+
+        Returns a copy of a payload cached for cost_cache_ttl, so callers
+        may modify it without affecting later calls.
+        """
         # This would integrate with cloud provider APIs for real cost data
         # For now, estimate based on usage patterns
 
-        total_requests = sum(stats['requests'] for stats in self.service_stats.values())
+        now = time.monotonic()
+        if self._cost_cache and now - self._cost_cache[0] < self.cost_cache_ttl:
+            return self._copy_cost_analytics(self._cost_cache[1])
 
-        # Estimated costs (mock data)
-        estimated_costs = {
-            'openai_api': total_requests * 0.002,  # $0.002 per request estimate
-            'claude_api': total_requests * 0.003,
-            'perplexity_api': total_requests * 0.001,
-            'supabase': 25.0,  # Fixed monthly
-            'redis': 15.0,
-            'hosting': 20.0
-        }
+        self._fold_service_requests()
+        total_requests = int(self._svc_requests.sum())
 
-        total_monthly = sum(estimated_costs.values())
+        variable_costs = total_requests * self._cost_per_request
+        estimated_costs = dict(zip(self._cost_providers, variable_costs.tolist()))
+        estimated_costs.update(self._fixed_costs)
 
-        return {
+        total_monthly = float(variable_costs.sum()) + self._fixed_costs_total
+
+        analytics = {
             'current_month_estimate': total_monthly,
             'breakdown': estimated_costs,
             'requests_this_period': total_requests,
@@ -484,6 +698,14 @@ class MonitoringService:
             'projected_monthly': total_monthly * (30 / datetime.now().day)
         }
 
+        self._cost_cache = (now, analytics)
+        return self._copy_cost_analytics(analytics)
+
+    @staticmethod
+    def _copy_cost_analytics(analytics: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a cost analytics payload (its only nested dict is the breakdown)"""
+        return {**analytics, 'breakdown': dict(analytics['breakdown'])}
+
 # Global monitoring service instance
 _monitoring_service = None
 
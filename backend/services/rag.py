@@ -4,29 +4,60 @@ Advanced knowledge retrieval with hybrid search and re-ranking
 """
 
 import asyncio
+import re
 import time
-from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from typing import List, Dict, Any, Literal, Optional, Tuple
 from datetime import datetime
 import hashlib
+import numpy as np
 
 from config import settings
 from services.embeddings import embedding_service
 from services.storage import supabase_client
 from services.cache import cache_manager
 from utils.logger import get_logger, performance_logger
+from utils.tokenizer import get_token_encoder
+from utils.rank_fusion import cc_fuse, rrf_fuse
 
 logger = get_logger(__name__)
 
+# Search types whose results carry a query/chunk embedding similarity
+SEMANTIC_SEARCH_TYPES = ("vector", "hybrid")
+
+# How _hybrid_search combines vector and full-text scores
+FusionMode = Literal["rrf", "cc", "weighted"]
+
+@lru_cache(maxsize=1024)
+def _query_terms_pattern(query: str) -> Optional["re.Pattern"]:
+    """Compile an alternation of the query terms, matched case-insensitively (None if no terms)"""
+    terms = query.lower().split()
+    if not terms:
+        return None
+    # Longest first so a term is not shadowed by one of its prefixes
+    return re.compile("|".join(map(re.escape, sorted(set(terms), key=len, reverse=True))), re.IGNORECASE)
+
 class RAGService:
     """
     Advanced RAG service with hybrid search, re-ranking, and intelligent context management
     """
 
+    ANALYTICS_BATCH_MAX_SIZE = 50  # Max search_queries rows per insert
+    ANALYTICS_BATCH_WINDOW = 0.5  # Seconds to wait for more searches to log
+
     def __init__(self):
         self.default_top_k = settings.RAG_TOP_K
         self.default_threshold = settings.RAG_SIMILARITY_THRESHOLD
         self.max_context_tokens = 8000  # Maximum context size for LLM
 
+        # Fire-and-forget tasks (analytics, cache writes), referenced until done
+        self._background_tasks: set = set()
+
+        # Search analytics batching state (created lazily on the running event loop)
+        self._analytics_queue: Optional[asyncio.Queue] = None
+        self._analytics_worker_task: Optional[asyncio.Task] = None
+        self._analytics_loop: Optional[asyncio.AbstractEventLoop] = None
+
     async def search_knowledge(
         self,
         query: str,
@@ -34,7 +65,8 @@ class RAGService:
         similarity_threshold: float = None,
         search_type: str = "hybrid",
         include_context_ids: Optional[List[str]] = None,
-        rerank: bool = True
+        rerank: bool = True,
+        fusion: FusionMode = "rrf"
     ) -> List[Dict[str, Any]]:
         """
         Search knowledge base using advanced RAG techniques
@@ -46,6 +78,9 @@ class RAGService:
             search_type: Type of search ("vector", "fulltext", "hybrid")
             include_context_ids: Specific note IDs to include in search
             rerank: Whether to apply re-ranking
+            fusion: Hybrid score fusion ("rrf": reciprocal rank fusion,
+                "cc": convex combination of min-max normalized scores,
+                "weighted": fixed 70/30 blend of raw scores)
 
         Returns:
             List of relevant documents with scores and metadata
@@ -57,7 +92,7 @@ class RAGService:
         try:
             # Check cache first
             cache_key = self._generate_search_cache_key(
-                query, limit, similarity_threshold, search_type
+                query, limit, similarity_threshold, search_type, fusion
             )
             cached_results = await cache_manager.get_search_results(cache_key, search_type)
 
@@ -73,7 +108,7 @@ class RAGService:
             elif search_type == "fulltext":
                 results = await self._fulltext_search(query, limit)
             else:  # hybrid
-                results = await self._hybrid_search(query, limit, similarity_threshold)
+                results = await self._hybrid_search(query, limit, similarity_threshold, fusion)
 
             # Filter by context IDs if specified
             if include_context_ids:
@@ -86,11 +121,12 @@ class RAGService:
             # Enhance results with metadata
             enhanced_results = await self._enhance_results_metadata(results, query)
 
-            # Log search analytics
-            await self._log_search_analytics(query, len(enhanced_results), time.time() - start_time)
-
-            # Cache results
-            await cache_manager.set_search_results(cache_key, search_type, enhanced_results)
+            # Queue search analytics and cache results off the response path
+            task = asyncio.create_task(self._record_search(
+                query, cache_key, search_type, enhanced_results, time.time() - start_time
+            ))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
 
             processing_time_ms = (time.time() - start_time) * 1000
             logger.info("Knowledge search completed",
@@ -186,7 +222,8 @@ class RAGService:
         self,
         query: str,
         limit: int,
-        similarity_threshold: float
+        similarity_threshold: float,
+        fusion: FusionMode = "rrf"
     ) -> List[Dict[str, Any]]:
         """Perform hybrid search combining vector and full-text"""
         try:
@@ -201,31 +238,47 @@ class RAGService:
                 match_count=limit * 2  # Get more to allow for re-ranking
             )
 
-            # Format results
-            formatted_results = []
-            for result in results:
-                # Combine vector similarity and text rank for hybrid score
-                similarity = result.get("similarity", 0.0)
-                text_rank = result.get("rank", 0.0)
+            similarities = np.fromiter(
+                (result.get("similarity", 0.0) for result in results), dtype=np.float64, count=len(results)
+            )
+            text_ranks = np.fromiter(
+                (result.get("rank", 0.0) for result in results), dtype=np.float64, count=len(results)
+            )
 
+            if fusion == "cc":
+                hybrid_scores = cc_fuse(similarities, text_ranks, alpha=settings.RAG_FUSION_ALPHA)
+            elif fusion == "weighted":
                 # Weighted hybrid score (70% vector, 30% text)
-                hybrid_score = (similarity * 0.7) + (min(text_rank, 1.0) * 0.3)
+                hybrid_scores = similarities * 0.7 + np.minimum(text_ranks, 1.0) * 0.3
+            else:  # rrf
+                # Rank the candidates separately by each retriever, then fuse the ranks:
+                # cosine similarity and ts_rank live on incomparable scales
+                vector_order = np.argsort(-similarities, kind="stable")
+                text_order = np.argsort(-text_ranks, kind="stable")
+                hybrid_scores = rrf_fuse(
+                    (
+                        vector_order[similarities[vector_order] > similarity_threshold],
+                        text_order[text_ranks[text_order] > 0],
+                    ),
+                    size=len(results)
+                )
 
-                formatted_results.append({
-                    "id": result.get("id"),
-                    "note_id": result.get("note_id"),
-                    "title": result.get("title", ""),
-                    "chunk_text": result.get("chunk_text"),
-                    "similarity_score": similarity,
-                    "text_rank": text_rank,
-                    "relevance_score": hybrid_score,
+            # Stable descending order, only the rows that are returned get formatted
+            order = np.argsort(-hybrid_scores, kind="stable")[:limit]
+
+            return [
+                {
+                    "id": results[i].get("id"),
+                    "note_id": results[i].get("note_id"),
+                    "title": results[i].get("title", ""),
+                    "chunk_text": results[i].get("chunk_text"),
+                    "similarity_score": results[i].get("similarity", 0.0),
+                    "text_rank": results[i].get("rank", 0.0),
+                    "relevance_score": float(hybrid_scores[i]),
                     "search_type": "hybrid"
-                })
-
-            # Sort by hybrid score
-            formatted_results.sort(key=lambda x: x["relevance_score"], reverse=True)
-
-            return formatted_results[:limit]
+                }
+                for i in order.tolist()
+            ]
 
         except Exception as e:
             logger.error("Hybrid search failed", error=str(e))
@@ -239,33 +292,38 @@ class RAGService:
     ) -> List[Dict[str, Any]]:
         """
         Re-rank search results for better relevance using query-document similarity
+
+        Vector and hybrid results already carry the cosine similarity between
+        the query embedding and the chunk embedding (computed by pgvector), so
+        it is reused as the re-ranking signal. Only full-text results, which
+        have no embedding score, fall back to keyword overlap.
         """
         try:
             if len(results) <= 1:
                 return results
 
-            # Simple re-ranking based on query-document text similarity
             reranked_results = []
-
-            query_words = set(query.lower().split())
+            query_words = None  # Tokenized lazily, only if a full-text result needs it
 
             for result in results:
-                chunk_text = result.get("chunk_text", "").lower()
-                chunk_words = set(chunk_text.split())
-
-                # Calculate text overlap score
-                if len(query_words) > 0:
-                    overlap = len(query_words.intersection(chunk_words))
-                    text_similarity = overlap / len(query_words)
+                if result.get("search_type") in SEMANTIC_SEARCH_TYPES:
+                    rerank_similarity = result.get("similarity_score", 0.0)
                 else:
-                    text_similarity = 0.0
+                    if query_words is None:
+                        query_words = set(query.lower().split())
+                    chunk_words = set(result.get("chunk_text", "").lower().split())
+
+                    # Calculate text overlap score
+                    if len(query_words) > 0:
+                        overlap = len(query_words.intersection(chunk_words))
+                        rerank_similarity = overlap / len(query_words)
+                    else:
+                        rerank_similarity = 0.0
+                    result["text_similarity"] = rerank_similarity
 
                 # Combine with existing relevance score
                 original_score = result.get("relevance_score", 0.0)
-                boosted_score = (original_score * 0.8) + (text_similarity * 0.2)
-
-                result["relevance_score"] = boosted_score
-                result["text_similarity"] = text_similarity
+                result["relevance_score"] = (original_score * 0.8) + (rerank_similarity * 0.2)
                 reranked_results.append(result)
 
             # Sort by boosted score
@@ -286,14 +344,15 @@ class RAGService:
         results: List[Dict[str, Any]],
         query: str
     ) -> List[Dict[str, Any]]:
-        """Enhance results with additional metadata"""
+        """Enhance results with additional metadata (in place)"""
         try:
-            enhanced = []
+            # Identical for every result of one query
+            retrieved_at = datetime.utcnow().isoformat()
 
             for result in results:
                 # Add query context
                 result["query"] = query
-                result["retrieved_at"] = datetime.utcnow().isoformat()
+                result["retrieved_at"] = retrieved_at
 
                 # Add content preview with highlighting
                 chunk_text = result.get("chunk_text", "")
@@ -307,9 +366,7 @@ class RAGService:
                     result, query
                 )
 
-                enhanced.append(result)
-
-            return enhanced
+            return results
 
         except Exception as e:
             logger.warning("Failed to enhance results metadata", error=str(e))
@@ -318,18 +375,14 @@ class RAGService:
     def _create_content_preview(self, content: str, query: str, max_length: int = 200) -> str:
         """Create a content preview with query term highlighting"""
         try:
-            # Find query terms in content
-            query_terms = query.lower().split()
-            content_lower = content.lower()
-
-            # Find best position to start preview (around query terms)
+            # Find best position to start preview: the first query term occurrence,
+            # located in a single regex pass over the content
             best_start = 0
-            for term in query_terms:
-                pos = content_lower.find(term)
-                if pos != -1:
-                    # Start a bit before the term
-                    best_start = max(0, pos - 50)
-                    break
+            pattern = _query_terms_pattern(query)
+            match = pattern.search(content) if pattern else None
+            if match:
+                # Start a bit before the term
+                best_start = max(0, match.start() - 50)
 
             # Create preview
             preview = content[best_start:best_start + max_length]
@@ -382,32 +435,103 @@ class RAGService:
             logger.warning("Failed to generate relevance explanation", error=str(e))
             return "Relevant to query"
 
-    async def _log_search_analytics(
+    async def _record_search(
         self,
         query: str,
-        results_count: int,
+        cache_key: str,
+        search_type: str,
+        results: List[Dict[str, Any]],
         execution_time_seconds: float
     ):
-        """Log search query for analytics"""
+        """Queue the search analytics and cache the results"""
+        self._log_search_analytics(query, len(results), execution_time_seconds)
         try:
-            await supabase_client.log_search_query(
-                query=query,
-                results_count=results_count,
-                execution_time_ms=int(execution_time_seconds * 1000)
-            )
+            await cache_manager.set_search_results(cache_key, search_type, results)
         except Exception as e:
-            logger.warning("Failed to log search analytics", error=str(e))
+            logger.warning("Failed to cache search results", error=str(e))
+
+    def _log_search_analytics(
+        self,
+        query: str,
+        results_count: int,
+        execution_time_seconds: float
+    ):
+        """Queue a search query for the analytics batch worker (no database round-trip)"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._analytics_loop is not loop
+            or self._analytics_worker_task is None
+            or self._analytics_worker_task.done()
+        ):
+            self._analytics_queue = asyncio.Queue()
+            self._analytics_loop = loop
+            self._analytics_worker_task = asyncio.create_task(
+                self._analytics_worker(self._analytics_queue)
+            )
+
+        self._analytics_queue.put_nowait({
+            "query": query,
+            "results_count": results_count,
+            "execution_time_ms": int(execution_time_seconds * 1000)
+        })
+
+    async def _analytics_worker(self, queue: asyncio.Queue):
+        """
+        Insert the searches logged within ANALYTICS_BATCH_WINDOW as one multi-row insert
+        """
+
+        while True:
+            batch = [await queue.get()]
+
+            # Let concurrent searches join the batch
+            try:
+                await asyncio.sleep(self.ANALYTICS_BATCH_WINDOW)
+            except asyncio.CancelledError:
+                # Stopped by close(): hand the rows back for its final flush
+                for row in batch:
+                    queue.put_nowait(row)
+                raise
+            while len(batch) < self.ANALYTICS_BATCH_MAX_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            await supabase_client.log_search_queries_bulk(batch)
+
+    async def close(self):
+        """Flush the queued search analytics and stop the batch worker"""
+        # Searches still being recorded queue their analytics first
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+        task = self._analytics_worker_task
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._analytics_worker_task = None
+
+        queue = self._analytics_queue
+        if queue is None:
+            return
+        batch = []
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+            if len(batch) == self.ANALYTICS_BATCH_MAX_SIZE or queue.empty():
+                await supabase_client.log_search_queries_bulk(batch)
+                batch = []
 
     def _generate_search_cache_key(
         self,
         query: str,
         limit: int,
         threshold: float,
-        search_type: str
+        search_type: str,
+        fusion: str = "rrf"
     ) -> str:
         """Generate cache key for search results"""
-        content = f"{query}:{limit}:{threshold}:{search_type}"
-        return hashlib.md5(content.encode()).hexdigest()
+        content = f"{query}:{limit}:{threshold}:{search_type}:{fusion}"
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
 
     async def prepare_context_for_llm(
         self,
@@ -431,27 +555,43 @@ class RAGService:
             sources_used = []
             estimated_tokens = 0
 
+            # Exact BPE counts when tiktoken is available (rough: 4 chars per token otherwise)
+            encoder = get_token_encoder()
+
             for i, result in enumerate(results):
                 title = result.get("title", "Document sans titre")
                 content = result.get("chunk_text", "")
                 similarity = result.get("relevance_score", 0.0)
 
                 # Format source entry
-                source_text = f"\n[SOURCE {i+1}] - {title} (pertinence: {similarity:.0%})\n{content}\n"
+                header = f"\n[SOURCE {i+1}] - {title} (pertinence: {similarity:.0%})\n"
+                source_text = f"{header}{content}\n"
 
-                # Estimate tokens (rough: 4 chars per token)
-                estimated_source_tokens = len(source_text) // 4
+                if encoder is not None:
+                    content_tokens = encoder.encode(content)
+                    header_tokens = len(encoder.encode(header))
+                    estimated_source_tokens = header_tokens + len(content_tokens) + 1
+                else:
+                    estimated_source_tokens = len(source_text) // 4
 
                 # Check if adding this source would exceed limit
                 if estimated_tokens + estimated_source_tokens > max_tokens:
                     # Try to fit partial content
                     remaining_tokens = max_tokens - estimated_tokens
-                    remaining_chars = remaining_tokens * 4
-
-                    if remaining_chars > 200:  # Minimum meaningful content
-                        truncated_content = content[:remaining_chars - 100] + "..."
-                        source_text = f"\n[SOURCE {i+1}] - {title} (pertinence: {similarity:.0%})\n{truncated_content}\n"
-                        context_parts.append(source_text)
+                    truncated_content = None
+
+                    if encoder is not None:
+                        # Keep room for the header, the ellipsis and the trailing newline
+                        content_budget = remaining_tokens - header_tokens - 4
+                        if content_budget > 25:  # Minimum meaningful content
+                            truncated_content = encoder.decode(content_tokens[:content_budget]) + "..."
+                    else:
+                        remaining_chars = remaining_tokens * 4
+                        if remaining_chars > 200:  # Minimum meaningful content
+                            truncated_content = content[:remaining_chars - 100] + "..."
+
+                    if truncated_content is not None:
+                        context_parts.append(f"{header}{truncated_content}\n")
                         sources_used.append(result)
 
                     break
@@ -547,7 +687,29 @@ class RAGService:
             # Create a query from title and content snippet
             query = f"{title} {content[:200]}"
 
-            # Search for related content, excluding the source note
+            # Search from the note's stored chunk embeddings: no re-embedding
+            # call, and the source note is excluded server-side
+            rows = await supabase_client.match_related_documents(
+                note_id=note_id,
+                match_threshold=self.default_threshold,
+                match_count=limit
+            )
+            if rows:
+                results = [
+                    {
+                        "id": row.get("id"),
+                        "note_id": row.get("note_id"),
+                        "title": row.get("title"),
+                        "chunk_text": row.get("chunk_text"),
+                        "similarity_score": row.get("similarity", 0.0),
+                        "relevance_score": row.get("similarity", 0.0),
+                        "search_type": "vector"
+                    }
+                    for row in rows
+                ]
+                return await self._enhance_results_metadata(results, query)
+
+            # Note not embedded yet: embed its text instead
             results = await self.search_knowledge(
                 query=query,
                 limit=limit * 2,
@@ -7,15 +7,20 @@ import asyncio
 import json
 import time
 from typing import List, Dict, Any, Optional, Tuple, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 import numpy as np
 import httpx
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from services.embeddings import embedding_service
 from services.storage import supabase_client
 from config import get_settings
+from utils.rank_fusion import RRF_K, mmr_order
+from utils.semantic_cache import SemanticCache, normalize_embedding
+
+# Query term matches only separate documents with (nearly) equal fused scores
+RRF_TIE_BREAK_WEIGHT = 0.01
 
 @dataclass
 class SearchResult:
@@ -59,15 +64,25 @@ class AdvancedRAGService:
         # Performance tracking
         self.query_stats = defaultdict(list)
         self.auto_tune_params = {
-            'vector_weight': 0.4,
-            'fulltext_weight': 0.3,
-            'web_weight': 0.2,
-            'knowledge_weight': 0.1,
             'similarity_threshold': 0.75,
             'max_results': 15,
             'web_search_trigger': 0.6  # If confidence < 0.6, trigger web search
         }
 
+        # Shared HTTP client for web search (keeps connections alive between calls)
+        self._http_client: Optional[httpx.AsyncClient] = None
+
+        # Wall-clock budget for the parallel searches: sources still running
+        # (usually web search) are cancelled and the search goes on without them
+        self.search_time_budget = 4.0  # Seconds
+
+        # Diversity re-ranking (MMR) of the top candidates, using title embeddings
+        self.mmr_lambda = 0.7  # 1.0 = relevance only
+        self.mmr_pool_size = 20
+
+        # Semantic cache of recent contexts, keyed by (max_results, include_web)
+        self._context_cache: SemanticCache[RAGContext] = SemanticCache(size=512, threshold=0.97, ttl=300)
+
     async def search(self,
                     query: str,
                     max_results: int = 10,
@@ -88,28 +103,45 @@ class AdvancedRAGService:
         # Step 1: Generate query embedding
         query_embedding = await self.embedding_service.get_embedding(query)
 
+        # Near-duplicate of a recent query: reuse its context, skip all searches
+        query_vector = normalize_embedding(query_embedding)
+        cache_params = (max_results, include_web)
+        cached_context = self._context_cache.lookup(query_vector, cache_params)
+        if cached_context is not None:
+            context = replace(
+                cached_context,
+                query=query,
+                processing_time=time.time() - start_time,
+                search_strategy="cache_hit"
+            )
+            await self._track_search(context)
+            return context
+
         # Step 2: Parallel search across all sources
-        search_tasks = [
-            self._vector_search(query, query_embedding, max_results),
-            self._fulltext_search(query, max_results),
-            self._knowledge_graph_search(query, max_results)
-        ]
+        search_tasks = {
+            'vector': asyncio.create_task(self._vector_search(query, query_embedding, max_results)),
+            'fulltext': asyncio.create_task(self._fulltext_search(query, max_results)),
+            'knowledge_graph': asyncio.create_task(self._knowledge_graph_search(query, max_results))
+        }
 
         # Add web search if enabled
         if include_web:
-            search_tasks.extend([
-                self._perplexity_search(query, max_results // 3),
-                self._tavily_search(query, max_results // 3)
-            ])
-
-        # Execute searches in parallel
-        results = await asyncio.gather(*search_tasks, return_exceptions=True)
-
-        # Step 3: Process and combine results
+            search_tasks['perplexity'] = asyncio.create_task(self._perplexity_search(query, max_results // 3))
+            search_tasks['tavily'] = asyncio.create_task(self._tavily_search(query, max_results // 3))
+
+        # Execute searches in parallel, within the time budget
+        done, pending = await asyncio.wait(search_tasks.values(), timeout=self.search_time_budget)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        timed_out_sources = [name for name, task in search_tasks.items() if task in pending]
+
+        # Step 3: Process and combine results (in source order)
         all_results = []
-        for i, result in enumerate(results):
-            if not isinstance(result, Exception) and result:
-                all_results.extend(result)
+        for task in search_tasks.values():
+            if task in done and task.exception() is None and task.result():
+                all_results.extend(task.result())
 
         # Step 4: Re-rank with advanced scoring
         ranked_results = await self._advanced_reranking(query, query_embedding, all_results)
@@ -130,6 +162,8 @@ class AdvancedRAGService:
         sources_summary = defaultdict(int)
         for result in final_results:
             sources_summary[result.source_type] += 1
+        for source in timed_out_sources:
+            sources_summary[f"timeout:{source}"] += 1
 
         context = RAGContext(
             query=query,
@@ -141,11 +175,30 @@ class AdvancedRAGService:
             sources_summary=dict(sources_summary)
         )
 
+        # Partial contexts (a source timed out) are not reused
+        if not timed_out_sources:
+            self._context_cache.store(query_vector, cache_params, context)
+
         # Track for analytics
         await self._track_search(context)
 
         return context
 
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared client for the web search APIs, created on first use"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+        return self._http_client
+
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
     async def _vector_search(self, query: str, embedding: List[float], max_results: int) -> List[SearchResult]:
         """Vector similarity search in documents"""
         try:
@@ -193,10 +246,13 @@ class AdvancedRAGService:
                 .limit(max_results) \
                 .execute()
 
+            # Tokenize the query once for every row
+            query_terms = query.lower().split()
+
             search_results = []
             for row in result.data:
                 # Calculate BM25-like score (simplified)
-                score = self._calculate_bm25_score(query, row['content'])
+                score = self._calculate_bm25_score(query_terms, row['content'])
 
                 search_results.append(SearchResult(
                     content=row['content'][:500] + "..." if len(row['content']) > 500 else row['content'],
@@ -221,31 +277,31 @@ class AdvancedRAGService:
     async def _perplexity_search(self, query: str, max_results: int) -> List[SearchResult]:
         """Web search using Perplexity AI"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.perplexity.ai/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.settings.PERPLEXITY_API_KEY}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "llama-3.1-sonar-small-128k-online",
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are a helpful research assistant. Provide factual, up-to-date information with sources."
-                            },
-                            {
-                                "role": "user",
-                                "content": f"Search for recent information about: {query}. Provide key insights with sources."
-                            }
-                        ],
-                        "max_tokens": 1000,
-                        "temperature": 0.2,
-                        "return_citations": True
-                    },
-                    timeout=10.0
-                )
+            client = self._get_http_client()
+            response = await client.post(
+                "https://api.perplexity.ai/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {self.settings.PERPLEXITY_API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": "llama-3.1-sonar-small-128k-online",
+                    "messages": [
+                        {
+                            "role": "system",
+                            "content": "You are a helpful research assistant. Provide factual, up-to-date information with sources."
+                        },
+                        {
+                            "role": "user",
+                            "content": f"Search for recent information about: {query}. Provide key insights with sources."
+                        }
+                    ],
+                    "max_tokens": 1000,
+                    "temperature": 0.2,
+                    "return_citations": True
+                },
+                timeout=10.0
+            )
 
             if response.status_code == 200:
                 data = response.json()
@@ -280,24 +336,24 @@ class AdvancedRAGService:
     async def _tavily_search(self, query: str, max_results: int) -> List[SearchResult]:
         """Web search using Tavily"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.tavily.com/search",
-                    headers={
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "api_key": self.settings.TAVILY_API_KEY,
-                        "query": query,
-                        "search_depth": "advanced",
-                        "include_answer": True,
-                        "include_raw_content": False,
-                        "max_results": max_results,
-                        "include_domains": [],
-                        "exclude_domains": []
-                    },
-                    timeout=10.0
-                )
+            client = self._get_http_client()
+            response = await client.post(
+                "https://api.tavily.com/search",
+                headers={
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "api_key": self.settings.TAVILY_API_KEY,
+                    "query": query,
+                    "search_depth": "advanced",
+                    "include_answer": True,
+                    "include_raw_content": False,
+                    "max_results": max_results,
+                    "include_domains": [],
+                    "exclude_domains": []
+                },
+                timeout=10.0
+            )
 
             if response.status_code == 200:
                 data = response.json()
@@ -350,8 +406,6 @@ class AdvancedRAGService:
             # For now, implement basic document connections
             # TODO: Implement proper knowledge graph with entities and relationships
 
-            query_embedding = await self.embedding_service.get_embedding(query)
-
             # Find documents with similar topics/entities
             result = self.supabase.from_('notes') \
                 .select('id, title, content, tags, metadata') \
@@ -359,6 +413,7 @@ class AdvancedRAGService:
                 .execute()
 
             knowledge_results = []
+            query_lower = query.lower()
 
             for row in result.data:
                 # Simple knowledge connections based on tags and topics
@@ -372,13 +427,13 @@ class AdvancedRAGService:
 
                 # Tag connections
                 for tag in tags:
-                    if tag.lower() in query.lower():
+                    if tag.lower() in query_lower:
                         connection_score += 0.3
                         connections.append(f"tag:{tag}")
 
                 # Topic connections
                 for topic in topics:
-                    if topic.lower() in query.lower():
+                    if topic.lower() in query_lower:
                         connection_score += 0.2
                         connections.append(f"topic:{topic}")
 
@@ -409,61 +464,108 @@ class AdvancedRAGService:
             return []
 
     async def _advanced_reranking(self, query: str, query_embedding: List[float], results: List[SearchResult]) -> List[SearchResult]:
-        """Advanced re-ranking with multiple signals"""
+        """
+        Reciprocal Rank Fusion of the per-retriever rankings, then MMR diversity
+
+        Each retriever scores on its own scale (cosine, BM25-like, fixed web
+        scores), so only ranks are fused: a document scores sum(1 / (k + rank))
+        over the retrievers that returned it, scaled to [0, 1]. Query term
+        matches in title and content only break near-ties.
+        """
 
         if not results:
             return results
 
-        # Calculate composite scores
-        for result in results:
-            composite_score = 0
-
-            # Original score weighted by source type
-            if result.source_type == 'document':
-                composite_score += result.score * self.auto_tune_params['vector_weight']
-            elif result.source_type == 'web':
-                composite_score += result.score * self.auto_tune_params['web_weight']
-            elif result.source_type == 'knowledge_graph':
-                composite_score += result.score * self.auto_tune_params['knowledge_weight']
-
-            # Query relevance boost
-            query_terms = query.lower().split()
-            content_lower = result.content.lower()
-            title_lower = result.title.lower()
-
-            # Title matching gets high boost
-            title_matches = sum(1 for term in query_terms if term in title_lower)
-            composite_score += (title_matches / len(query_terms)) * 0.3
-
-            # Content density boost
-            content_matches = sum(1 for term in query_terms if term in content_lower)
-            composite_score += (content_matches / len(query_terms)) * 0.2
-
-            # Recency boost for web results
-            if result.source_type == 'web':
-                time_diff = datetime.now() - result.timestamp
-                if time_diff.days < 1:
-                    composite_score += 0.1  # Recent web content boost
+        # Rank every retriever's results by its native score, then fuse ranks
+        # per document (the best-ranked occurrence represents it)
+        scores = np.fromiter((r.score for r in results), dtype=np.float64, count=len(results))
+        rankings = defaultdict(list)
+        for i, result in enumerate(results):
+            rankings[self._retriever_of(result)].append(i)
+
+        fused: Dict[str, List] = {}  # document key -> [rrf score, representative index, its rank]
+        for indices in rankings.values():
+            indices = np.asarray(indices)
+            seen = set()
+            for i in indices[np.argsort(-scores[indices], kind="stable")].tolist():
+                key = self._document_key(results[i])
+                if key in seen:
+                    continue
+                seen.add(key)
+                rank = len(seen)
+                entry = fused.get(key)
+                if entry is None:
+                    fused[key] = [1.0 / (RRF_K + rank), i, rank]
+                else:
+                    entry[0] += 1.0 / (RRF_K + rank)
+                    if rank < entry[2]:
+                        entry[1], entry[2] = i, rank
+
+        representatives = [entry[1] for entry in fused.values()]
+        rrf_scores = np.fromiter((entry[0] for entry in fused.values()), dtype=np.float64, count=len(fused))
+        # First in every retriever -> 1.0
+        composite_scores = rrf_scores * (RRF_K + 1) / len(rankings)
+
+        # Title matching weighs more than content matching, as a small tie-breaker
+        query_term_counts = Counter(query.lower().split())
+        query_term_total = sum(query_term_counts.values())
+        if query_term_total:
+            for position, i in enumerate(representatives):
+                title_lower = results[i].title.lower()
+                content_lower = results[i].content.lower()
+                matches = 0.0
+                for term, occurrences in query_term_counts.items():
+                    if term in title_lower:
+                        matches += occurrences * 0.3
+                    if term in content_lower:
+                        matches += occurrences * 0.2
+                composite_scores[position] += RRF_TIE_BREAK_WEIGHT * matches / query_term_total
+
+        results = [results[i] for i in representatives]
+
+        # Sort by fused score (stable, like list.sort)
+        order = np.argsort(-composite_scores, kind="stable")
+
+        # Diversity penalty (avoid too similar results): MMR over the top candidates
+        pool = order[:self.mmr_pool_size]
+        if len(pool) > 2:
+            try:
+                embeddings = await self.embedding_service.batch_embeddings(
+                    [results[i].title[:128] for i in pool.tolist()]
+                )
+                diverse = mmr_order(
+                    composite_scores[pool], np.asarray(embeddings, dtype=np.float32), self.mmr_lambda
+                )
+                order = np.concatenate([pool[diverse], order[len(pool):]])
+            except Exception as e:
+                print(f"Diversity re-ranking error: {e}")
 
-            # Diversity penalty (avoid too similar results)
-            # TODO: Implement semantic similarity checking
+        for result, score in zip(results, composite_scores.tolist()):
+            result.score = score
 
-            result.score = composite_score
+        return [results[i] for i in order.tolist()]
 
-        # Sort by composite score
-        results.sort(key=lambda x: x.score, reverse=True)
+    @staticmethod
+    def _retriever_of(result: SearchResult) -> str:
+        """Retriever that produced a result, from its source ("document", "fulltext", "web:tavily", ...)"""
+        parts = result.source.split(":", 2)
+        return ":".join(parts[:2]) if parts[0] == "web" else parts[0]
 
-        return results
+    @staticmethod
+    def _document_key(result: SearchResult) -> str:
+        """Identity used to fuse a document across retrievers (note id, else source)"""
+        document_id = result.metadata.get('document_id')
+        return f"document:{document_id}" if document_id else result.source
 
-    def _calculate_bm25_score(self, query: str, document: str) -> float:
-        """Simplified BM25 scoring"""
+    def _calculate_bm25_score(self, query_terms: List[str], document: str) -> float:
+        """Simplified BM25 scoring of a document against the lowercased query terms"""
         # Simplified implementation - in production use proper BM25
-        query_terms = query.lower().split()
-        doc_terms = document.lower().split()
+        # Term frequencies in one pass over the document
+        term_counts = Counter(document.lower().split())
 
         score = 0
         for term in query_terms:
-            tf = doc_terms.count(term)
+            tf = term_counts.get(term, 0)
             if tf > 0:
                 # Simplified BM25 formula
                 score += tf / (tf + 1.5)
@@ -504,7 +606,12 @@ class AdvancedRAGService:
         return len(covered_terms) / len(query_terms)
 
     async def _auto_tune_parameters(self, query: str, results: List[SearchResult], confidence: float):
-        """Auto-tune RAG parameters based on performance"""
+        """
+        Record query performance for auto-tuning
+
+        Source weights are no longer tuned here: re-ranking fuses ranks (RRF),
+        which does not depend on per-source score scales.
+        """
 
         # Store query performance
         self.query_stats[query].append({
@@ -514,23 +621,6 @@ class AdvancedRAGService:
             'sources': [r.source_type for r in results]
         })
 
-        # Adapt parameters based on recent performance
-        recent_stats = list(self.query_stats.values())[-100:]  # Last 100 queries
-
-        if len(recent_stats) >= 10:
-            avg_confidence = sum(stat[0]['confidence'] for stat in recent_stats) / len(recent_stats)
-
-            # If confidence is consistently low, adjust parameters
-            if avg_confidence < 0.6:
-                # Increase web search weight
-                self.auto_tune_params['web_weight'] = min(0.4, self.auto_tune_params['web_weight'] + 0.05)
-                self.auto_tune_params['vector_weight'] = max(0.2, self.auto_tune_params['vector_weight'] - 0.05)
-
-            # If confidence is high, can reduce web dependency
-            elif avg_confidence > 0.8:
-                self.auto_tune_params['vector_weight'] = min(0.5, self.auto_tune_params['vector_weight'] + 0.05)
-                self.auto_tune_params['web_weight'] = max(0.1, self.auto_tune_params['web_weight'] - 0.05)
-
     async def _track_search(self, context: RAGContext):
         """Track search analytics"""
         try:
@@ -7,7 +7,9 @@ from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import uuid
 import asyncio
+import json
 
+import asyncpg
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
 
@@ -21,6 +23,7 @@ class SupabaseService:
 
     def __init__(self):
         self.client: Optional[Client] = None
+        self.pool: Optional[asyncpg.Pool] = None
         self._initialized = False
 
     async def initialize(self):
@@ -39,6 +42,9 @@ class SupabaseService:
                 options=options
             )
 
+            # Direct Postgres pool for hot-path queries
+            await self._initialize_pool()
+
             # Test connection
             await self.test_connection()
             self._initialized = True
@@ -48,6 +54,44 @@ class SupabaseService:
             logger.error("Failed to initialize Supabase client", error=str(e))
             raise
 
+    async def _initialize_pool(self):
+        """
+        Create the asyncpg pool used for per-turn queries
+
+        Skips the PostgREST HTTPS round-trip and JSON re-encoding. Callers fall
+        back to the Supabase client when the pool is unavailable.
+        """
+        try:
+            self.pool = await asyncpg.create_pool(
+                settings.DATABASE_URL,
+                min_size=10,
+                max_size=settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+                max_inactive_connection_lifetime=300,
+                init=self._init_connection
+            )
+            logger.info("Postgres connection pool initialized")
+
+        except Exception as e:
+            self.pool = None
+            logger.warning("Postgres pool unavailable, using PostgREST only", error=str(e))
+
+    @staticmethod
+    async def _init_connection(connection: asyncpg.Connection):
+        """Decode JSONB columns to Python objects, like PostgREST responses"""
+        await connection.set_type_codec(
+            "jsonb",
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog"
+        )
+
+    async def close(self):
+        """Close the Postgres connection pool"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Postgres connection pool closed")
+
     async def test_connection(self) -> bool:
         """Test database connection"""
         try:
@@ -375,6 +419,33 @@ class SupabaseService:
             logger.error("Hybrid search failed", error=str(e))
             raise
 
+    async def match_related_documents(
+        self,
+        note_id: str,
+        match_threshold: float = 0.78,
+        match_count: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Vector search from a note's stored chunk embeddings, excluding the note itself"""
+        try:
+            start_time = datetime.utcnow()
+
+            result = self.client.rpc('match_related_documents', {
+                'p_note_id': note_id,
+                'match_threshold': match_threshold,
+                'match_count': match_count
+            }).execute()
+
+            processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            performance_logger.log_database_query("match_related_documents", processing_time)
+
+            results = result.data or []
+            logger.debug("Related documents search completed", results_count=len(results), processing_time_ms=processing_time)
+            return results
+
+        except Exception as e:
+            logger.error("Related documents search failed", error=str(e))
+            raise
+
     # =============================================================================
     # ANALYTICS & MONITORING
     # =============================================================================
@@ -395,6 +466,21 @@ class SupabaseService:
             # Don't fail the main operation if analytics logging fails
             logger.warning("Failed to log search query", error=str(e))
 
+    async def log_search_queries_bulk(self, rows: List[Dict[str, Any]]):
+        """Log a batch of search queries for analytics with a single insert"""
+        if not rows:
+            return
+        try:
+            # The Supabase client is synchronous: keep the request off the event loop
+            await asyncio.to_thread(
+                lambda: self.client.table('search_queries').insert(rows).execute()
+            )
+            logger.debug("Search queries logged for analytics", count=len(rows))
+
+        except Exception as e:
+            # Don't fail the main operation if analytics logging fails
+            logger.warning("Failed to log search queries", count=len(rows), error=str(e))
+
     async def get_performance_stats(self) -> Dict[str, Any]:
         """Get database performance statistics"""
         try:
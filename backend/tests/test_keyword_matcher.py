@@ -0,0 +1,82 @@
+"""
+Tests unitaires pour keyword_matcher.py
+Vérifie que le scan en une passe équivaut aux recherches de sous-chaînes
+"""
+
+import pytest
+from utils.keyword_matcher import KeywordMatcher, flatten_keyword_table
+
+
+TABLE = {
+    "recherche": ["cherche", "quel", "quelle", "comment"],
+    "discussion": ["compare", "vs"],
+    "question": ["?", "comment", "que"],
+}
+ENTRIES = flatten_keyword_table(TABLE)
+
+
+def naive_scan(table, text):
+    """Reference implementation: one substring search per keyword"""
+    return {
+        tag: sum(1 for kw in keywords if kw in text) / len(keywords)
+        for tag, keywords in table.items()
+    }
+
+
+class TestKeywordMatcher:
+    """Tests pour KeywordMatcher"""
+
+    @pytest.mark.parametrize("text", [
+        "",
+        "quelle est la différence ?",
+        "comment comparer python vs rust",
+        "je cherche quelque chose, je cherche encore",
+        "aucun mot clé ici",
+        "🙂 123 456",
+    ])
+    def test_matches_naive_substring_scan(self, text):
+        """Test que les scores sont identiques à la version naïve"""
+        tallies = KeywordMatcher(ENTRIES).scan(text)
+        expected = naive_scan(TABLE, text)
+
+        assert tallies == pytest.approx(expected)
+
+    def test_repeated_keyword_counted_once(self):
+        """Test qu'un mot clé répété ne compte qu'une fois"""
+        tallies = KeywordMatcher(ENTRIES).scan("compare compare compare")
+
+        assert tallies["discussion"] == pytest.approx(0.5)
+
+    def test_shared_keyword_counts_for_each_tag(self):
+        """Test qu'un mot clé partagé compte pour chaque tag"""
+        tallies = KeywordMatcher(ENTRIES).scan("comment")
+
+        assert tallies["recherche"] == pytest.approx(0.25)
+        assert tallies["question"] == pytest.approx(1 / 3)
+
+    def test_custom_weights(self):
+        """Test que les poids des entrées sont respectés"""
+        matcher = KeywordMatcher([("compare", "discussion", 0.4), ("vs", "discussion", 0.1)])
+
+        assert matcher.scan("compare x vs y")["discussion"] == pytest.approx(0.5)
+        assert matcher.scan("rien")["discussion"] == 0.0
+
+    def test_word_start_skips_mid_word_hits(self):
+        """Test que word_start ignore les mots clés en milieu de mot"""
+        matcher = KeywordMatcher(ENTRIES, word_start=True)
+
+        assert matcher.scan("explique")["question"] == 0.0
+        assert matcher.scan("lequel")["recherche"] == 0.0
+        assert matcher.scan("quelles ?")["recherche"] == pytest.approx(0.5)
+        assert matcher.scan("pourquoi?")["question"] == pytest.approx(1 / 3)
+
+    def test_trie_fallback_matches_automaton(self, monkeypatch):
+        """Test que le fallback trie donne les mêmes résultats"""
+        import utils.keyword_matcher as keyword_matcher
+        monkeypatch.setattr(keyword_matcher, "AHOCORASICK_AVAILABLE", False)
+
+        text = "quelle comparaison vs comment ?"
+        tallies = keyword_matcher.KeywordMatcher(ENTRIES).scan(text)
+
+        assert tallies == pytest.approx(naive_scan(TABLE, text))
+        assert keyword_matcher.KeywordMatcher(ENTRIES, word_start=True).scan("explique")["question"] == 0.0
@@ -0,0 +1,24 @@
+"""
+Tests unitaires pour get_cost_analytics de monitoring_service.py
+Vérifie que le résultat en cache n'est pas partagé avec les appelants
+"""
+
+import asyncio
+
+from services.monitoring_service import MonitoringService
+
+
+class TestCostAnalytics:
+    """Tests pour get_cost_analytics"""
+
+    def test_cached_payload_not_shared_with_callers(self):
+        """Test que modifier le résultat n'altère pas le cache"""
+        monitor = MonitoringService()
+
+        first = asyncio.run(monitor.get_cost_analytics())
+        first["current_month_estimate"] = -1
+        first["breakdown"]["supabase"] = -1
+        second = asyncio.run(monitor.get_cost_analytics())
+
+        assert second["current_month_estimate"] > 0
+        assert second["breakdown"]["supabase"] == 25.0
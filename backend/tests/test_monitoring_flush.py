@@ -0,0 +1,147 @@
+"""
+Tests unitaires pour l'insertion par lots de monitoring_service.py
+Vérifie que les lignes en tampon sont écrites via le client Supabase synchrone
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from services import monitoring_service
+from services.monitoring_service import Alert, MonitoringService, SystemMetrics
+
+
+class StubQuery:
+    """Requête Supabase synchrone: insert(...).execute()"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        self.client.threads.append(threading.current_thread())
+        self.client.inserted.setdefault(self.table, []).extend(self.rows)
+        return object()  # APIResponse n'est pas awaitable
+
+
+class StubClient:
+    """Client Supabase synchrone enregistrant les insertions"""
+
+    def __init__(self):
+        self.inserted = {}
+        self.threads = []
+
+    def table(self, name):
+        return StubQuery(self, name)
+
+
+class StubStorage:
+    """Service de stockage exposant le client synchrone"""
+
+    def __init__(self):
+        self.client = StubClient()
+
+
+class RecordingLogger:
+    """Logger enregistrant les erreurs"""
+
+    def __init__(self):
+        self.errors = []
+
+    def error(self, event, **kwargs):
+        self.errors.append((event, kwargs))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture
+def logger(monkeypatch):
+    recording = RecordingLogger()
+    monkeypatch.setattr(monitoring_service, "logger", recording)
+    return recording
+
+
+@pytest.fixture
+def service(logger):
+    monitor = MonitoringService()
+    monitor.supabase = StubStorage()
+    return monitor
+
+
+def make_metrics():
+    return SystemMetrics(
+        timestamp=datetime(2026, 1, 1, 12, 0),
+        cpu_percent=10.0,
+        memory_percent=20.0,
+        memory_used_mb=512.0,
+        memory_total_mb=2048.0,
+        disk_usage_percent=30.0,
+        disk_free_gb=50.0,
+        network_sent_mb=1.0,
+        network_recv_mb=2.0,
+    )
+
+
+class TestFlushBuffers:
+    """Tests pour MonitoringService._flush_buffers"""
+
+    def test_rows_written_without_error(self, service, logger):
+        """Test que les lignes sont insérées et qu'aucune erreur n'est loggée"""
+        service._buffer_row(service._metrics_buffer, make_metrics())
+        service._buffer_row(service._metrics_buffer, make_metrics())
+
+        asyncio.run(service._flush_buffers())
+
+        rows = service.supabase.client.inserted["system_metrics"]
+        assert len(rows) == 2
+        assert rows[0]["timestamp"].startswith("2026-01-01T12:00")
+        assert service._metrics_buffer == []
+        assert logger.errors == []
+
+    def test_insert_runs_off_the_event_loop_thread(self, service):
+        """Test que l'appel HTTP synchrone ne bloque pas la boucle"""
+        service._buffer_row(service._metrics_buffer, make_metrics())
+
+        asyncio.run(service._flush_buffers())
+
+        assert service.supabase.client.threads
+        assert threading.main_thread() not in service.supabase.client.threads
+
+    def test_alert_rows_exclude_occurrences(self, service, logger):
+        """Test que les alertes sont insérées sans le compteur en mémoire"""
+        alert = Alert(
+            id="a1",
+            type="cpu_high",
+            severity="warning",
+            message="CPU élevé",
+            timestamp=datetime(2026, 1, 1, 12, 0),
+            details={"cpu_percent": 95.0},
+        )
+        service._buffer_row(service._alerts_buffer, alert, exclude=("occurrences",))
+
+        asyncio.run(service._flush_buffers())
+
+        rows = service.supabase.client.inserted["alerts"]
+        assert len(rows) == 1
+        assert "occurrences" not in rows[0]
+        assert logger.errors == []
+
+    def test_failed_insert_logged(self, service, logger, monkeypatch):
+        """Test qu'un échec d'insertion est loggé sans lever d'exception"""
+        def failing_execute(query):
+            raise RuntimeError("network down")
+
+        monkeypatch.setattr(StubQuery, "execute", failing_execute)
+        service._buffer_row(service._metrics_buffer, make_metrics())
+
+        asyncio.run(service._flush_buffers())
+
+        assert len(logger.errors) == 1
+        assert logger.errors[0][1]["table"] == "system_metrics"
@@ -0,0 +1,36 @@
+"""
+Tests unitaires pour le suivi des requêtes par service de monitoring_service.py
+Vérifie qu'aucune requête n'est perdue quand un anneau se remplit entre deux drains
+"""
+
+import pytest
+from services.monitoring_service import MonitoringService
+
+
+class TestServiceRequests:
+    """Tests pour track_service_request"""
+
+    def test_counts_recorded_requests(self):
+        """Test que les requêtes enregistrées sont comptées au drain"""
+        monitor = MonitoringService()
+        monitor.track_service_request("search", 0.2, True)
+        monitor.track_service_request("search", 0.4, False)
+
+        stats = monitor.get_service_analytics()["search"]
+
+        assert stats["total_requests"] == 2
+        assert stats["error_rate"] == pytest.approx(50.0)
+        assert stats["avg_response_time_ms"] == pytest.approx(0.3)
+
+    def test_full_ring_folded_instead_of_dropped(self):
+        """Test qu'un anneau plein est replié au lieu de perdre les plus anciennes"""
+        monitor = MonitoringService()
+        monitor.service_ring_size = 8
+
+        for i in range(30):
+            monitor.track_service_request("chat", 1.0, i % 3 != 0)
+
+        assert len(monitor._svc_ring["chat"]) <= 8
+        stats = monitor.get_service_analytics()["chat"]
+        assert stats["total_requests"] == 30
+        assert stats["error_rate"] == pytest.approx(10 / 30 * 100)
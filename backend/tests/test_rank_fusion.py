@@ -0,0 +1,85 @@
+"""
+Tests unitaires pour rank_fusion.py
+Vérifie la fusion RRF, la combinaison convexe et l'ordre MMR
+"""
+
+import numpy as np
+import pytest
+from utils.rank_fusion import RRF_K, cc_fuse, mmr_order, rrf_fuse
+
+
+class TestRRFFuse:
+    """Tests pour rrf_fuse"""
+
+    def test_first_in_both_rankings_scores_one(self):
+        """Test qu'un candidat premier dans les deux classements vaut 1.0"""
+        scores = rrf_fuse((np.array([2, 0, 1]), np.array([2, 1, 0])), size=3)
+
+        assert scores[2] == pytest.approx(1.0)
+        assert scores.max() == pytest.approx(1.0)
+
+    def test_candidate_missing_from_one_ranking(self):
+        """Test qu'un candidat absent d'un classement ne reçoit que l'autre contribution"""
+        scores = rrf_fuse((np.array([0, 1]), np.array([0])), size=3)
+
+        assert scores[1] == pytest.approx((RRF_K + 1) / 2 / (RRF_K + 2))
+        assert scores[2] == 0.0
+        assert scores[0] > scores[1] > scores[2]
+
+    def test_empty_rankings(self):
+        """Test que des classements vides donnent des scores nuls"""
+        scores = rrf_fuse((np.array([], dtype=np.intp), np.array([], dtype=np.intp)), size=2)
+
+        assert scores.tolist() == [0.0, 0.0]
+
+
+class TestCCFuse:
+    """Tests pour cc_fuse"""
+
+    def test_constant_inputs_have_no_nan(self):
+        """Test que des scores constants ne produisent pas de NaN"""
+        scores = cc_fuse(np.full(4, 0.8), np.zeros(4), alpha=0.5)
+
+        assert not np.isnan(scores).any()
+        assert scores.tolist() == [0.0, 0.0, 0.0, 0.0]
+
+    def test_constant_side_keeps_other_ordering(self):
+        """Test qu'un côté constant laisse l'autre décider de l'ordre"""
+        scores = cc_fuse(np.array([0.2, 0.9, 0.5]), np.full(3, 0.1), alpha=0.5)
+
+        assert scores.tolist() == pytest.approx([0.0, 0.5, 0.5 * 3 / 7])
+
+    def test_empty_inputs(self):
+        """Test que des entrées vides donnent un résultat vide"""
+        assert cc_fuse(np.array([]), np.array([])).size == 0
+
+
+class TestMMROrder:
+    """Tests pour mmr_order"""
+
+    def test_returns_permutation(self):
+        """Test que l'ordre MMR est une permutation des candidats"""
+        rng = np.random.default_rng(0)
+        order = mmr_order(rng.random(8), rng.normal(size=(8, 5)), lambda_=0.7)
+
+        assert sorted(order.tolist()) == list(range(8))
+
+    def test_near_duplicate_moves_below_distinct_candidate(self):
+        """Test qu'un quasi-doublon passe derrière un candidat différent"""
+        relevance = np.array([1.0, 0.95, 0.9])
+        embeddings = np.array([
+            [1.0, 0.0],
+            [0.999, 0.01],  # Quasi-doublon du premier
+            [0.0, 1.0],
+        ])
+
+        order = mmr_order(relevance, embeddings, lambda_=0.7)
+
+        assert order.tolist() == [0, 2, 1]
+
+    def test_relevance_only(self):
+        """Test qu'avec lambda_=1 l'ordre suit la pertinence"""
+        relevance = np.array([0.2, 0.9, 0.5])
+        embeddings = np.eye(3)
+
+        assert mmr_order(relevance, embeddings, lambda_=1.0).tolist() == [1, 2, 0]
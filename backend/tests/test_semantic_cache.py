@@ -0,0 +1,83 @@
+"""
+Tests unitaires pour semantic_cache.py
+Vérifie les hits sur requêtes proches, la clé de paramètres et l'expiration
+"""
+
+import pytest
+from utils import semantic_cache
+from utils.semantic_cache import SemanticCache, normalize_embedding
+
+
+QUERY = normalize_embedding([1.0, 0.0, 0.0])
+NEAR_QUERY = normalize_embedding([1.0, 0.05, 0.0])
+OTHER_QUERY = normalize_embedding([0.0, 1.0, 0.0])
+
+
+class FakeClock:
+    """Horloge contrôlée pour tester l'expiration"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(semantic_cache.time, "time", fake.time)
+    return fake
+
+
+class TestSemanticCache:
+    """Tests pour SemanticCache"""
+
+    def test_hit_on_near_duplicate_query(self, clock):
+        """Test qu'une requête quasi identique retrouve la valeur"""
+        cache = SemanticCache(size=4, threshold=0.97, ttl=300)
+        cache.store(QUERY, (10, True), "context")
+
+        assert cache.lookup(NEAR_QUERY, (10, True)) == "context"
+
+    def test_miss_on_distinct_query(self, clock):
+        """Test qu'une requête différente ne touche pas le cache"""
+        cache = SemanticCache(size=4, threshold=0.97, ttl=300)
+        cache.store(QUERY, (10, True), "context")
+
+        assert cache.lookup(OTHER_QUERY, (10, True)) is None
+
+    @pytest.mark.parametrize("params", [(5, True), (10, False)])
+    def test_miss_on_different_params(self, clock, params):
+        """Test qu'un autre (max_results, include_web) ne touche pas le cache"""
+        cache = SemanticCache(size=4, threshold=0.97, ttl=300)
+        cache.store(QUERY, (10, True), "context")
+
+        assert cache.lookup(QUERY, params) is None
+
+    def test_miss_after_ttl(self, clock):
+        """Test qu'une entrée expirée n'est plus retournée"""
+        cache = SemanticCache(size=4, threshold=0.97, ttl=300)
+        cache.store(QUERY, (10, True), "context")
+
+        clock.now += 299
+        assert cache.lookup(QUERY, (10, True)) == "context"
+        clock.now += 1
+        assert cache.lookup(QUERY, (10, True)) is None
+
+    def test_oldest_slot_overwritten(self, clock):
+        """Test que le plus ancien emplacement est écrasé quand le cache est plein"""
+        cache = SemanticCache(size=1, threshold=0.97, ttl=300)
+        cache.store(QUERY, (10, True), "first")
+        cache.store(OTHER_QUERY, (10, True), "second")
+
+        assert cache.lookup(QUERY, (10, True)) is None
+        assert cache.lookup(OTHER_QUERY, (10, True)) == "second"
+
+    def test_zero_vector_not_cached(self, clock):
+        """Test qu'un embedding nul n'est ni stocké ni recherché"""
+        cache = SemanticCache(size=4, threshold=0.97, ttl=300)
+
+        assert normalize_embedding([0.0, 0.0, 0.0]) is None
+        cache.store(None, (10, True), "context")
+        assert cache.lookup(None, (10, True)) is None
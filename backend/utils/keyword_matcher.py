@@ -0,0 +1,162 @@
+"""
+Keyword Matcher - Single-pass multi-keyword scanning
+Used by the intent classifier to tally keyword hits per tag in one pass
+Backed by an Aho-Corasick automaton (pyahocorasick) with a pure-Python trie fallback
+"""
+
+import re
+from typing import Dict, Iterable, Iterator, Tuple
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    # Fallback to the pure-Python trie below
+    AHOCORASICK_AVAILABLE = False
+
+
+# Flat matcher entry: (keyword, tag, weight)
+KeywordEntry = Tuple[str, str, float]
+
+# Payload stored for each keyword: (keyword, ((tag, weight), ...))
+KeywordPayload = Tuple[str, Tuple[Tuple[str, float], ...]]
+
+
+def flatten_keyword_table(table: Dict[str, Iterable[str]]) -> Tuple[KeywordEntry, ...]:
+    """
+    Flatten a {tag: keywords} table into (keyword, tag, weight) entries
+
+    Each keyword weighs 1/len(keywords) of its tag, so a tag's tally is the
+    fraction of its keywords found in the text.
+    """
+    entries = []
+    for tag, keywords in table.items():
+        keywords = sorted(set(keywords))
+        if not keywords:
+            continue
+        weight = 1.0 / len(keywords)
+        entries.extend((keyword, tag, weight) for keyword in keywords)
+    return tuple(entries)
+
+
+class KeywordMatcher:
+    """
+    Multi-keyword matcher compiled once from (keyword, tag, weight) entries
+
+    scan() walks the text once and returns, for each tag, the summed weight
+    of the distinct keywords found. With flatten_keyword_table() weights this
+    equals `sum(1 for kw in keywords if kw in text) / len(keywords)`.
+    A keyword shared by several tags counts for each of them.
+
+    With word_start=True, a keyword starting with a letter or digit only
+    matches at the start of a word ("quel" matches "quelles" but not
+    "lequel"), like a leading word boundary in a regex. Trailing boundaries
+    are not enforced so inflected forms ("compare" -> "comparer") match.
+    """
+
+    def __init__(self, entries: Iterable[KeywordEntry], word_start: bool = False):
+        payloads: Dict[str, list] = {}
+        self.word_start = word_start
+
+        for keyword, tag, weight in entries:
+            payloads.setdefault(keyword, []).append((tag, weight))
+
+        self.tags = tuple(dict.fromkeys(
+            tag for entries in payloads.values() for tag, _ in entries
+        ))
+        self._payloads: Dict[str, KeywordPayload] = {
+            keyword: (keyword, tuple(entries))
+            for keyword, entries in payloads.items()
+        }
+
+        # No keyword can match a text that contains none of their first characters
+        self._first_chars = frozenset(keyword[0] for keyword in self._payloads if keyword)
+
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, payload in self._payloads.items():
+                self._automaton.add_word(keyword, payload)
+            self._automaton.make_automaton()
+            self._iter_matches = self._iter_automaton
+        else:
+            self._trie = self._build_trie(self._payloads)
+            self._start_re = self._build_start_pattern(self._trie, word_start)
+            self._iter_matches = self._iter_trie
+
+    @staticmethod
+    def _build_trie(payloads: Dict[str, KeywordPayload]) -> dict:
+        """Build a nested-dict trie; the None key holds the payload of a keyword ending there"""
+        trie: dict = {}
+        for keyword, payload in payloads.items():
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[None] = payload
+        return trie
+
+    @staticmethod
+    def _build_start_pattern(trie: dict, word_start: bool) -> "re.Pattern":
+        """
+        Compile a character class of the trie's first characters
+
+        Lets the regex engine find candidate start positions in C instead of
+        trying a trie walk at every character. Letters and digits also get a
+        lookbehind when keywords must start a word.
+        """
+        first_chars = [char for char in trie if char is not None]
+        word_chars = "".join(re.escape(char) for char in first_chars if char.isalnum())
+        other_chars = "".join(re.escape(char) for char in first_chars if not char.isalnum())
+
+        alternatives = []
+        if word_chars:
+            prefix = r"(?<![^\W_])" if word_start else ""
+            alternatives.append(f"{prefix}[{word_chars}]")
+        if other_chars:
+            alternatives.append(f"[{other_chars}]")
+
+        # (?!) never matches: an empty table has no start positions
+        return re.compile("|".join(alternatives) or "(?!)")
+
+    def _iter_automaton(self, text: str) -> Iterator[KeywordPayload]:
+        """Yield payloads of every keyword occurrence using the C automaton"""
+        word_start = self.word_start
+        for end, payload in self._automaton.iter(text):
+            if word_start:
+                start = end - len(payload[0]) + 1
+                if start > 0 and text[start].isalnum() and text[start - 1].isalnum():
+                    continue
+            yield payload
+
+    def _iter_trie(self, text: str) -> Iterator[KeywordPayload]:
+        """Yield payloads of every keyword occurrence by walking the trie from each candidate start"""
+        trie = self._trie
+        n = len(text)
+        for match in self._start_re.finditer(text):
+            node = trie
+            j = match.start()
+            while j < n:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                if None in node:
+                    yield node[None]
+                j += 1
+
+    def scan(self, text: str) -> Dict[str, float]:
+        """Return the weighted count of distinct keywords found in text, per tag"""
+        tallies = dict.fromkeys(self.tags, 0.0)
+
+        # Prefilter: C-level membership loop, no allocation, exits on first hit
+        if self._first_chars.isdisjoint(text):
+            return tallies
+
+        seen = set()
+
+        for keyword, entries in self._iter_matches(text):
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            for tag, weight in entries:
+                tallies[tag] += weight
+
+        return tallies
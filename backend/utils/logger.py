@@ -4,7 +4,10 @@ Uses structlog for better debugging and monitoring
 """
 
 import structlog
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from typing import Any, Dict, Optional
 from datetime import datetime
@@ -12,15 +15,30 @@ import json
 
 from config import settings
 
+# Writes log records to stdout from a background thread (see setup_logging)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
 def setup_logging():
     """Configure structured logging for the application"""
+    global _log_listener
 
     # Configure stdlib logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, settings.LOG_LEVEL.value),
-    )
+    # Records are queued by the calling thread and written to stdout by a
+    # listener thread, so a burst of logs never blocks the event loop on I/O
+    if _log_listener is None:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+
+        logging.basicConfig(
+            format="%(message)s",
+            level=getattr(logging, settings.LOG_LEVEL.value),
+            handlers=[logging.handlers.QueueHandler(log_queue)],
+        )
+
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
 
     # Configure structlog
     structlog.configure(
@@ -0,0 +1,79 @@
+"""
+Rank Fusion - Score fusion and diversity ordering for search results
+Used by the RAG services to merge vector/full-text rankings and to diversify
+the top candidates with Maximal Marginal Relevance
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+# Reciprocal Rank Fusion constant (Cormack et al.): damps the weight of top ranks
+RRF_K = 60
+
+
+def rrf_fuse(rankings: Sequence[np.ndarray], size: int, k: int = RRF_K) -> np.ndarray:
+    """
+    Reciprocal Rank Fusion of rankings of candidate indices
+
+    Each candidate scores sum(1 / (k + rank)) over the rankings it appears
+    in (rank starting at 1), candidates missing from a ranking get nothing
+    from it. Scores are scaled so that a candidate ranked first by every
+    ranking gets 1.0, keeping them in [0, 1].
+    """
+    scores = np.zeros(size)
+    if not rankings:
+        return scores
+    for ranking in rankings:
+        scores[ranking] += 1.0 / (k + np.arange(1, len(ranking) + 1))
+    return scores * (k + 1) / len(rankings)
+
+
+def min_max_normalize(scores: np.ndarray) -> np.ndarray:
+    """Rescale scores to [0, 1] (all zeros when the scores are constant)"""
+    if scores.size == 0:
+        return scores
+    spread = scores.max() - scores.min()
+    if spread <= 0:
+        return np.zeros_like(scores, dtype=np.float64)
+    return (scores - scores.min()) / spread
+
+
+def cc_fuse(vector_scores: np.ndarray, text_scores: np.ndarray, alpha: float = 0.5) -> np.ndarray:
+    """
+    Convex combination of min-max normalized scores (Bruch et al.)
+
+    Each retriever's scores are rescaled to [0, 1] over this query's
+    candidates, then blended as alpha * vector + (1 - alpha) * text.
+    Unlike RRF, score gaps between candidates are preserved.
+    """
+    return alpha * min_max_normalize(vector_scores) + (1 - alpha) * min_max_normalize(text_scores)
+
+
+def mmr_order(relevance: np.ndarray, embeddings: np.ndarray, lambda_: float) -> np.ndarray:
+    """
+    Maximal Marginal Relevance order of candidates
+
+    Greedily picks the candidate maximizing
+    lambda_ * relevance - (1 - lambda_) * max cosine similarity to those already picked.
+    Returns a permutation of range(len(relevance)).
+    """
+    norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings))
+    unit = embeddings / np.where(norms > 0, norms, 1.0)[:, None]
+    similarity = unit @ unit.T  # Pairwise cosine in one product
+
+    count = len(relevance)
+    max_similarity = np.zeros(count)
+    available = np.ones(count, dtype=bool)
+    picked = np.empty(count, dtype=np.intp)
+
+    for step in range(count):
+        mmr = lambda_ * relevance - (1 - lambda_) * max_similarity
+        mmr[~available] = -np.inf
+        best = int(np.argmax(mmr))
+        picked[step] = best
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+    return picked
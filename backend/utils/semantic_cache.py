@@ -0,0 +1,72 @@
+"""
+Semantic Cache - Reuse of results for near-duplicate queries
+Used by the advanced RAG service to skip searches for a query whose embedding
+is close to a recent one made with the same search parameters
+"""
+
+import time
+from typing import Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+
+T = TypeVar("T")
+
+
+def normalize_embedding(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    """L2-normalized float32 copy of an embedding (None for a zero vector)"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.sqrt(np.vdot(vector, vector))
+    return vector / norm if norm > 0 else None
+
+
+class SemanticCache(Generic[T]):
+    """
+    Fixed-size ring of normalized query embeddings and their values
+
+    The embedding matrix is allocated on first store (its width is the
+    embedding dimension), a lookup is one matrix-vector product against
+    every cached query. Entries expire after ttl seconds and only match
+    lookups made with equal params.
+    """
+
+    def __init__(self, size: int = 512, threshold: float = 0.97, ttl: float = 300):
+        self.size = size
+        self.threshold = threshold  # Cosine similarity for a hit
+        self.ttl = ttl  # Seconds
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[T, float, Hashable]]] = [None] * size
+        self._next = 0
+
+    def lookup(self, query_vector: Optional[np.ndarray], params: Hashable) -> Optional[T]:
+        """Most similar fresh value stored with the same params, if above threshold"""
+        if query_vector is None or self._embeddings is None:
+            return None
+        if self._embeddings.shape[1] != query_vector.shape[0]:
+            return None
+
+        # Empty slots are zero vectors and score 0
+        similarities = self._embeddings @ query_vector
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        now = time.time()
+
+        for index in candidates[np.argsort(-similarities[candidates])]:
+            value, stored_at, entry_params = self._entries[index]
+            if entry_params == params and now - stored_at < self.ttl:
+                return value
+
+        return None
+
+    def store(self, query_vector: Optional[np.ndarray], params: Hashable, value: T):
+        """Store a value, overwriting the oldest slot"""
+        if query_vector is None:
+            return
+        if self._embeddings is None or self._embeddings.shape[1] != query_vector.shape[0]:
+            self._embeddings = np.zeros((self.size, query_vector.shape[0]), dtype=np.float32)
+            self._entries = [None] * self.size
+            self._next = 0
+
+        index = self._next
+        self._embeddings[index] = query_vector
+        self._entries[index] = (value, time.time(), params)
+        self._next = (index + 1) % self.size
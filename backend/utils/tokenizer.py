@@ -0,0 +1,32 @@
+"""
+Tokenizer - Shared tiktoken encoder for token budgets
+Loaded once on first use; callers fall back to character budgets without it
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    # Callers fall back to character budgets
+    TIKTOKEN_AVAILABLE = False
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+TOKEN_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def get_token_encoder():
+    """Load the TOKEN_ENCODING encoder once; None if tiktoken or its encoding files are unavailable"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        # Encoding files are fetched on first use and may be unreachable
+        logger.warning("Tokenizer unavailable, using character budgets", error=str(e))
+        return None
@@ -0,0 +1,80 @@
+-- Migration 005: HNSW index for long-term memory search
+-- Issue: messages_embedding_idx (ivfflat, lists=100) degrades to near-linear scans
+--        as the messages table grows, dominating search_similar_messages latency
+-- Fix: Rebuild the index as HNSW (partial, non-NULL embeddings only) and bound
+--      the graph search with hnsw.ef_search inside the RPC
+-- Requires: pgvector >= 0.5.0
+
+-- =============================================================================
+-- 1. REPLACE IVFFLAT INDEX WITH HNSW
+-- =============================================================================
+
+DROP INDEX IF EXISTS messages_embedding_idx;
+
+-- Partial index: messages without embedding (system, pending) are never searched
+CREATE INDEX IF NOT EXISTS messages_embedding_hnsw_idx
+ON messages USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64)
+WHERE embedding IS NOT NULL;
+
+-- =============================================================================
+-- 2. SEARCH FUNCTION WITH BOUNDED EF_SEARCH
+-- =============================================================================
+
+-- SET clause on the function behaves like SET LOCAL: the value only applies
+-- during the call (a SET statement in the body is rejected for STABLE functions)
+CREATE OR REPLACE FUNCTION search_similar_messages(
+    query_embedding vector(1536),
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_exclude_conversation_id UUID DEFAULT NULL,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+STABLE
+SET hnsw.ef_search = 40
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        m.id,
+        m.conversation_id,
+        m.role,
+        m.content,
+        m.created_at,
+        c.title as conversation_title,
+        1 - (m.embedding <=> query_embedding) as similarity
+    FROM messages m
+    JOIN conversations c ON m.conversation_id = c.id
+    WHERE
+        c.user_id = p_user_id
+        AND m.created_at > p_cutoff_date
+        AND (p_exclude_conversation_id IS NULL OR m.conversation_id != p_exclude_conversation_id)
+        AND m.embedding IS NOT NULL
+    ORDER BY m.embedding <=> query_embedding
+    LIMIT p_limit;
+END;
+$$;
+
+COMMENT ON FUNCTION search_similar_messages IS 'Search semantically similar messages using vector embeddings (HNSW, ef_search=40)';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP INDEX IF EXISTS messages_embedding_hnsw_idx;
+CREATE INDEX IF NOT EXISTS messages_embedding_idx
+ON messages USING ivfflat (embedding vector_cosine_ops)
+WITH (lists = 100);
+-- Then re-run section 3 of 002_add_memory_features.sql
+*/
@@ -0,0 +1,41 @@
+-- Migration 006: Batch update of message embeddings
+-- Issue: each stored message triggered its own UPDATE messages SET embedding ... WHERE id = ?
+-- Fix: The memory service coalesces embeddings and writes them in a single
+--      multi-row UPDATE through this function
+
+-- Embeddings arrive as a JSON array of float arrays (PostgREST RPC payload);
+-- each element's text form ('[0.1, 0.2, ...]') is valid vector input
+CREATE OR REPLACE FUNCTION update_message_embeddings(
+    p_ids UUID[],
+    p_embeddings JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated_count INT;
+BEGIN
+    UPDATE messages m
+    SET embedding = (v.emb::text)::vector(1536)
+    FROM (
+        SELECT ids.id, embs.emb
+        FROM unnest(p_ids) WITH ORDINALITY AS ids(id, ord)
+        JOIN jsonb_array_elements(p_embeddings) WITH ORDINALITY AS embs(emb, ord)
+            ON ids.ord = embs.ord
+    ) AS v
+    WHERE m.id = v.id;
+
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$;
+
+COMMENT ON FUNCTION update_message_embeddings IS 'Store embeddings for several messages in one UPDATE (ids and embeddings matched by position)';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS update_message_embeddings(UUID[], JSONB);
+*/
@@ -0,0 +1,35 @@
+-- Migration 007: Get-or-create user preferences in one call
+-- Issue: get_user_preferences issued a SELECT then, on miss, an INSERT:
+--        two round-trips, and concurrent first requests raced on user_id UNIQUE
+-- Fix: Single RPC inserting defaults with ON CONFLICT DO NOTHING, falling back
+--      to a SELECT when the row already exists (no write on the common path,
+--      so updated_at is left untouched)
+-- Relies on: user_preferences.user_id UNIQUE (002_add_memory_features.sql)
+
+CREATE OR REPLACE FUNCTION get_or_create_user_preferences(p_user_id UUID)
+RETURNS SETOF user_preferences
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    INSERT INTO user_preferences (user_id)
+    VALUES (p_user_id)
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING *;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT * FROM user_preferences WHERE user_id = p_user_id;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION get_or_create_user_preferences IS 'Return user preferences, inserting defaults on first access';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS get_or_create_user_preferences(UUID);
+*/
@@ -0,0 +1,40 @@
+-- Migration 008: Recent messages in chronological order
+-- Issue: get_recent_messages fetched the last N messages newest-first and
+--        reversed the list in Python
+-- Fix: Select the last N rows (messages_conversation_id_created_at_idx) and
+--      re-sort that small set ascending server-side
+
+CREATE OR REPLACE FUNCTION get_recent_messages_asc(
+    p_conversation_id UUID,
+    p_limit INT DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    role TEXT,
+    content TEXT,
+    metadata JSONB,
+    created_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT recent.id, recent.role, recent.content, recent.metadata, recent.created_at
+    FROM (
+        SELECT m.id, m.role, m.content, m.metadata, m.created_at
+        FROM messages m
+        WHERE m.conversation_id = p_conversation_id
+        ORDER BY m.created_at DESC
+        LIMIT p_limit
+    ) recent
+    ORDER BY recent.created_at ASC;
+$$;
+
+COMMENT ON FUNCTION get_recent_messages_asc IS 'Last p_limit messages of a conversation, oldest first';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS get_recent_messages_asc(UUID, INT);
+*/
@@ -0,0 +1,66 @@
+-- Migration 009: Stored conversation topic for long-term memory
+-- Issue: get_conversation_context rebuilt the topic from the last user
+--        messages and re-embedded it on every turn
+-- Fix: The memory service stores the topic and its embedding when a user
+--      message is saved; retrieval reuses the stored embedding server-side
+
+-- =============================================================================
+-- 1. TOPIC COLUMNS ON CONVERSATIONS
+-- =============================================================================
+
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS current_topic TEXT;
+
+ALTER TABLE conversations
+ADD COLUMN IF NOT EXISTS current_topic_embedding vector(1536);
+
+COMMENT ON COLUMN conversations.current_topic IS 'Topic extracted from the latest user messages (refreshed on each user message)';
+COMMENT ON COLUMN conversations.current_topic_embedding IS 'Embedding of current_topic, used as long-term memory query vector';
+
+-- =============================================================================
+-- 2. SEARCH BY STORED TOPIC
+-- =============================================================================
+
+-- The query vector never leaves the database
+CREATE OR REPLACE FUNCTION search_similar_messages_by_topic(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.*
+    FROM conversations c
+    CROSS JOIN LATERAL search_similar_messages(
+        c.current_topic_embedding,
+        p_user_id,
+        p_cutoff_date,
+        p_conversation_id,
+        p_limit
+    ) s
+    WHERE c.id = p_conversation_id
+        AND c.current_topic_embedding IS NOT NULL;
+$$;
+
+COMMENT ON FUNCTION search_similar_messages_by_topic IS 'search_similar_messages using the conversation stored topic embedding';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS search_similar_messages_by_topic(UUID, UUID, TIMESTAMP WITH TIME ZONE, INT);
+ALTER TABLE conversations DROP COLUMN IF EXISTS current_topic_embedding;
+ALTER TABLE conversations DROP COLUMN IF EXISTS current_topic;
+*/
@@ -0,0 +1,113 @@
+-- Migration 010: Store message embeddings as halfvec
+-- Issue: messages.embedding is vector(1536) FP32, 6 KB per row; the HNSW
+--        index over it is the hot memory of long-term memory search
+-- Fix: Convert the column to halfvec(1536) (FP16, 3 KB per row) and rebuild
+--      the HNSW index with halfvec_cosine_ops. Query vectors stay vector(1536)
+--      in function signatures and are cast on use.
+-- Requires: pgvector >= 0.7.0
+
+-- =============================================================================
+-- 1. CONVERT COLUMN (drops messages_embedding_hnsw_idx with the old column)
+-- =============================================================================
+
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS embedding_h halfvec(1536);
+
+UPDATE messages
+SET embedding_h = embedding::halfvec(1536)
+WHERE embedding IS NOT NULL;
+
+ALTER TABLE messages DROP COLUMN embedding;
+ALTER TABLE messages RENAME COLUMN embedding_h TO embedding;
+
+COMMENT ON COLUMN messages.embedding IS 'Vector embedding for semantic search (1536 dimensions, half precision)';
+
+CREATE INDEX IF NOT EXISTS messages_embedding_hnsw_idx
+ON messages USING hnsw (embedding halfvec_cosine_ops)
+WITH (m = 16, ef_construction = 64)
+WHERE embedding IS NOT NULL;
+
+-- =============================================================================
+-- 2. FUNCTIONS: CAST QUERY / WRITTEN VECTORS TO HALFVEC
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION search_similar_messages(
+    query_embedding vector(1536),
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_exclude_conversation_id UUID DEFAULT NULL,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+STABLE
+SET hnsw.ef_search = 40
+AS $$
+DECLARE
+    query_h halfvec(1536) := query_embedding::halfvec(1536);
+BEGIN
+    RETURN QUERY
+    SELECT
+        m.id,
+        m.conversation_id,
+        m.role,
+        m.content,
+        m.created_at,
+        c.title as conversation_title,
+        1 - (m.embedding <=> query_h) as similarity
+    FROM messages m
+    JOIN conversations c ON m.conversation_id = c.id
+    WHERE
+        c.user_id = p_user_id
+        AND m.created_at > p_cutoff_date
+        AND (p_exclude_conversation_id IS NULL OR m.conversation_id != p_exclude_conversation_id)
+        AND m.embedding IS NOT NULL
+    ORDER BY m.embedding <=> query_h
+    LIMIT p_limit;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION update_message_embeddings(
+    p_ids UUID[],
+    p_embeddings JSONB
+)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated_count INT;
+BEGIN
+    UPDATE messages m
+    SET embedding = (v.emb::text)::halfvec(1536)
+    FROM (
+        SELECT ids.id, embs.emb
+        FROM unnest(p_ids) WITH ORDINALITY AS ids(id, ord)
+        JOIN jsonb_array_elements(p_embeddings) WITH ORDINALITY AS embs(emb, ord)
+            ON ids.ord = embs.ord
+    ) AS v
+    WHERE m.id = v.id;
+
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$;
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+ALTER TABLE messages ADD COLUMN embedding_f vector(1536);
+UPDATE messages SET embedding_f = embedding::vector(1536) WHERE embedding IS NOT NULL;
+ALTER TABLE messages DROP COLUMN embedding;
+ALTER TABLE messages RENAME COLUMN embedding_f TO embedding;
+-- Then re-run 005, 006 and the function section of this migration with vector casts
+*/
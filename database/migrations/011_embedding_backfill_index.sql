@@ -0,0 +1,16 @@
+-- Migration 011: Index for the message embedding backfill
+-- The memory service periodically claims messages WHERE embedding IS NULL
+-- (FOR UPDATE SKIP LOCKED) to embed history and retry failed writes.
+-- This partial index only holds those rows, so it stays tiny once caught up.
+
+CREATE INDEX IF NOT EXISTS messages_embedding_missing_idx
+ON messages (created_at DESC)
+WHERE embedding IS NULL;
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP INDEX IF EXISTS messages_embedding_missing_idx;
+*/
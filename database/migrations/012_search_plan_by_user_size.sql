@@ -0,0 +1,172 @@
+-- Migration 012: Pick the similar-messages search plan from the user's message count
+-- Issue: search_similar_messages used the same HNSW plan (ef_search = 40) for
+--        every user. For small histories an exact scan over the user's rows is
+--        cheaper, and HNSW post-filtering by user can return fewer than p_limit
+--        rows; for very large histories ef_search = 40 loses recall.
+-- Fix: Keep a per-user message count (trigger-maintained) and branch inside
+--      the function: exact scan below 2000 messages, otherwise HNSW with
+--      ef_search = clamp(count / 1000 * 40, 40, 200)
+
+-- =============================================================================
+-- 1. PER-USER MESSAGE COUNT
+-- =============================================================================
+
+ALTER TABLE user_preferences
+ADD COLUMN IF NOT EXISTS message_count INT NOT NULL DEFAULT 0;
+
+COMMENT ON COLUMN user_preferences.message_count IS 'Number of messages in the user conversations (trigger-maintained, search plan hint)';
+
+UPDATE user_preferences p
+SET message_count = counts.total
+FROM (
+    SELECT c.user_id, COUNT(*)::INT AS total
+    FROM messages m
+    JOIN conversations c ON m.conversation_id = c.id
+    GROUP BY c.user_id
+) counts
+WHERE p.user_id = counts.user_id;
+
+CREATE OR REPLACE FUNCTION increment_user_message_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE user_preferences
+    SET message_count = message_count + 1
+    WHERE user_id = (SELECT user_id FROM conversations WHERE id = NEW.conversation_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS increment_user_message_count ON messages;
+CREATE TRIGGER increment_user_message_count
+    AFTER INSERT ON messages
+    FOR EACH ROW
+    EXECUTE FUNCTION increment_user_message_count();
+
+-- Counter bumps must not touch updated_at (last preferences change):
+-- user_preferences gets its own updated_at trigger function
+CREATE OR REPLACE FUNCTION update_user_preferences_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.message_count IS DISTINCT FROM OLD.message_count THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_user_preferences_updated_at ON user_preferences;
+CREATE TRIGGER update_user_preferences_updated_at
+    BEFORE UPDATE ON user_preferences
+    FOR EACH ROW
+    EXECUTE FUNCTION update_user_preferences_updated_at();
+
+-- =============================================================================
+-- 2. SEARCH FUNCTION WITH PLAN SELECTION
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION search_similar_messages(
+    query_embedding vector(1536),
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_exclude_conversation_id UUID DEFAULT NULL,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+STABLE
+SET hnsw.ef_search = 40
+AS $$
+DECLARE
+    query_h halfvec(1536) := query_embedding::halfvec(1536);
+    user_message_count INT;
+BEGIN
+    SELECT p.message_count INTO user_message_count
+    FROM user_preferences p
+    WHERE p.user_id = p_user_id;
+
+    IF COALESCE(user_message_count, 0) < 2000 THEN
+        -- Exact scan: the MATERIALIZED CTE keeps the planner from ordering
+        -- through the HNSW index, so only the user's rows are ranked
+        RETURN QUERY
+        WITH candidates AS MATERIALIZED (
+            SELECT
+                m.id,
+                m.conversation_id,
+                m.role,
+                m.content,
+                m.created_at,
+                c.title AS conversation_title,
+                m.embedding <=> query_h AS distance
+            FROM messages m
+            JOIN conversations c ON m.conversation_id = c.id
+            WHERE
+                c.user_id = p_user_id
+                AND m.created_at > p_cutoff_date
+                AND (p_exclude_conversation_id IS NULL OR m.conversation_id != p_exclude_conversation_id)
+                AND m.embedding IS NOT NULL
+        )
+        SELECT
+            cand.id,
+            cand.conversation_id,
+            cand.role,
+            cand.content,
+            cand.created_at,
+            cand.conversation_title,
+            1 - cand.distance AS similarity
+        FROM candidates cand
+        ORDER BY cand.distance
+        LIMIT p_limit;
+        RETURN;
+    END IF;
+
+    -- Reverted at function exit by the SET clause above
+    PERFORM set_config(
+        'hnsw.ef_search',
+        LEAST(GREATEST(user_message_count / 25, 40), 200)::TEXT,
+        true
+    );
+
+    RETURN QUERY
+    SELECT
+        m.id,
+        m.conversation_id,
+        m.role,
+        m.content,
+        m.created_at,
+        c.title as conversation_title,
+        1 - (m.embedding <=> query_h) as similarity
+    FROM messages m
+    JOIN conversations c ON m.conversation_id = c.id
+    WHERE
+        c.user_id = p_user_id
+        AND m.created_at > p_cutoff_date
+        AND (p_exclude_conversation_id IS NULL OR m.conversation_id != p_exclude_conversation_id)
+        AND m.embedding IS NOT NULL
+    ORDER BY m.embedding <=> query_h
+    LIMIT p_limit;
+END;
+$$;
+
+COMMENT ON FUNCTION search_similar_messages IS 'Search semantically similar messages (exact scan for small histories, HNSW with scaled ef_search otherwise)';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP TRIGGER IF EXISTS increment_user_message_count ON messages;
+DROP FUNCTION IF EXISTS increment_user_message_count();
+ALTER TABLE user_preferences DROP COLUMN IF EXISTS message_count;
+-- Then re-run section 7 of 002_add_memory_features.sql (updated_at trigger)
+-- and section 2 of 010_halfvec_message_embeddings.sql
+DROP FUNCTION IF EXISTS update_user_preferences_updated_at();
+*/
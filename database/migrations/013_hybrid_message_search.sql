@@ -0,0 +1,141 @@
+-- Migration 013: Hybrid (full-text + vector) long-term memory search
+-- Issue: Vector-only recall on short topic strings is noisy
+-- Fix: Rank messages with both a full-text query and the vector search, and
+--      fuse the two rankings with Reciprocal Rank Fusion:
+--      rrf = 1 / (60 + text_rank) + 1 / (60 + vector_rank)
+
+-- =============================================================================
+-- 1. FULL-TEXT COLUMN AND INDEX
+-- =============================================================================
+
+-- 'simple' config: conversations mix French and English
+ALTER TABLE messages
+ADD COLUMN IF NOT EXISTS content_tsv tsvector
+GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS messages_content_tsv_idx
+ON messages USING gin (content_tsv);
+
+-- =============================================================================
+-- 2. HYBRID SEARCH FUNCTION
+-- =============================================================================
+
+CREATE OR REPLACE FUNCTION search_similar_messages_hybrid(
+    query_text TEXT,
+    query_embedding vector(1536),
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_exclude_conversation_id UUID DEFAULT NULL,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT,
+    rrf_score FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH vector_hits AS (
+        -- Plan selection (exact scan / HNSW) is done by search_similar_messages
+        SELECT
+            s.*,
+            ROW_NUMBER() OVER (ORDER BY s.similarity DESC) AS vector_rank
+        FROM search_similar_messages(
+            query_embedding, p_user_id, p_cutoff_date, p_exclude_conversation_id, 50
+        ) s
+    ),
+    text_hits AS (
+        SELECT
+            m.id,
+            m.conversation_id,
+            m.role,
+            m.content,
+            m.created_at,
+            c.title AS conversation_title,
+            (1 - (m.embedding <=> query_embedding::halfvec(1536)))::FLOAT AS similarity,
+            ROW_NUMBER() OVER (ORDER BY ts_rank(m.content_tsv, q.query) DESC) AS text_rank
+        FROM messages m
+        JOIN conversations c ON m.conversation_id = c.id
+        CROSS JOIN plainto_tsquery('simple', query_text) AS q(query)
+        WHERE
+            m.content_tsv @@ q.query
+            AND c.user_id = p_user_id
+            AND m.created_at > p_cutoff_date
+            AND (p_exclude_conversation_id IS NULL OR m.conversation_id != p_exclude_conversation_id)
+        ORDER BY ts_rank(m.content_tsv, q.query) DESC
+        LIMIT 50
+    )
+    SELECT
+        COALESCE(v.id, t.id),
+        COALESCE(v.conversation_id, t.conversation_id),
+        COALESCE(v.role, t.role),
+        COALESCE(v.content, t.content),
+        COALESCE(v.created_at, t.created_at),
+        COALESCE(v.conversation_title, t.conversation_title),
+        COALESCE(v.similarity, t.similarity),
+        (COALESCE(1.0 / (60 + t.text_rank), 0) + COALESCE(1.0 / (60 + v.vector_rank), 0))::FLOAT AS rrf_score
+    FROM vector_hits v
+    FULL OUTER JOIN text_hits t ON v.id = t.id
+    ORDER BY rrf_score DESC
+    LIMIT p_limit;
+$$;
+
+COMMENT ON FUNCTION search_similar_messages_hybrid IS 'Long-term memory search fusing full-text and vector rankings (RRF, k=60)';
+
+-- =============================================================================
+-- 3. STORED TOPIC SEARCH USES THE HYBRID RANKING
+-- =============================================================================
+
+-- Return type changes (rrf_score): replace rather than CREATE OR REPLACE
+DROP FUNCTION IF EXISTS search_similar_messages_by_topic(UUID, UUID, TIMESTAMP WITH TIME ZONE, INT);
+
+CREATE FUNCTION search_similar_messages_by_topic(
+    p_conversation_id UUID,
+    p_user_id UUID,
+    p_cutoff_date TIMESTAMP WITH TIME ZONE,
+    p_limit INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    conversation_id UUID,
+    role TEXT,
+    content TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    conversation_title TEXT,
+    similarity FLOAT,
+    rrf_score FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.*
+    FROM conversations c
+    CROSS JOIN LATERAL search_similar_messages_hybrid(
+        c.current_topic,
+        c.current_topic_embedding,
+        p_user_id,
+        p_cutoff_date,
+        p_conversation_id,
+        p_limit
+    ) s
+    WHERE c.id = p_conversation_id
+        AND c.current_topic_embedding IS NOT NULL;
+$$;
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS search_similar_messages_by_topic(UUID, UUID, TIMESTAMP WITH TIME ZONE, INT);
+DROP FUNCTION IF EXISTS search_similar_messages_hybrid(TEXT, vector, UUID, TIMESTAMP WITH TIME ZONE, UUID, INT);
+DROP INDEX IF EXISTS messages_content_tsv_idx;
+ALTER TABLE messages DROP COLUMN IF EXISTS content_tsv;
+-- Then re-run section 2 of 009_conversation_topic.sql
+*/
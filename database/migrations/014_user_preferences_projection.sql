@@ -0,0 +1,44 @@
+-- Migration 014: Narrow get_or_create_user_preferences to the per-turn columns
+-- The memory service reads preferred_agent, topics_of_interest,
+-- interaction_patterns and updated_at on every turn; ids, user_id,
+-- created_at and message_count are no longer serialized.
+
+-- Return type changes: replace rather than CREATE OR REPLACE
+DROP FUNCTION IF EXISTS get_or_create_user_preferences(UUID);
+
+CREATE FUNCTION get_or_create_user_preferences(p_user_id UUID)
+RETURNS TABLE (
+    preferred_agent TEXT,
+    topics_of_interest TEXT[],
+    interaction_patterns JSONB,
+    updated_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+BEGIN
+    RETURN QUERY
+    INSERT INTO user_preferences AS p (user_id)
+    VALUES (p_user_id)
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING p.preferred_agent, p.topics_of_interest, p.interaction_patterns, p.updated_at;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT p.preferred_agent, p.topics_of_interest, p.interaction_patterns, p.updated_at
+        FROM user_preferences p
+        WHERE p.user_id = p_user_id;
+    END IF;
+END;
+$$;
+
+COMMENT ON FUNCTION get_or_create_user_preferences IS 'Return per-turn user preference columns, inserting defaults on first access';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS get_or_create_user_preferences(UUID);
+-- Then re-run 007_get_or_create_user_preferences.sql
+*/
@@ -0,0 +1,66 @@
+-- Migration 015: Related documents from the stored note embeddings
+-- Issue: RAGService.get_related_content re-embedded "title + content[:200]" of
+--        the source note through OpenAI, although its chunks are already embedded
+-- Fix: Search with the centroid (AVG) of the note's chunk embeddings, computed
+--      server-side, and exclude the note's own chunks in the same query
+
+-- =============================================================================
+-- 1. RELATED DOCUMENTS SEARCH
+-- =============================================================================
+
+-- Returns no rows when the note has no embedded chunk yet: the caller then
+-- falls back to embedding the note text
+CREATE OR REPLACE FUNCTION match_related_documents(
+    p_note_id UUID,
+    match_threshold float DEFAULT 0.78,
+    match_count int DEFAULT 10
+)
+RETURNS TABLE (
+    id UUID,
+    note_id UUID,
+    title TEXT,
+    chunk_text TEXT,
+    similarity float
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    v_centroid vector(1536);
+BEGIN
+    -- Uses idx_embeddings_note_id
+    SELECT AVG(e.embedding) INTO v_centroid
+    FROM embeddings e
+    WHERE e.note_id = p_note_id
+    AND e.embedding IS NOT NULL;
+
+    IF v_centroid IS NULL THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        e.id,
+        e.note_id,
+        n.title,
+        e.chunk_text,
+        1 - (e.embedding <=> v_centroid) AS similarity
+    FROM embeddings e
+    JOIN notes n ON e.note_id = n.id
+    WHERE n.is_deleted = FALSE
+    AND e.note_id <> p_note_id
+    AND 1 - (e.embedding <=> v_centroid) > match_threshold
+    ORDER BY e.embedding <=> v_centroid
+    LIMIT match_count;
+END;
+$$;
+
+COMMENT ON FUNCTION match_related_documents IS 'Chunks similar to the centroid of a note''s chunk embeddings, excluding the note itself';
+
+-- =============================================================================
+-- ROLLBACK SCRIPT (For reference - do not execute)
+-- =============================================================================
+
+/*
+DROP FUNCTION IF EXISTS match_related_documents(UUID, float, int);
+*/